@@ -1,23 +1,47 @@
 #!/usr/bin/env python3
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, HttpUrl
-from typing import List, Optional, Dict, Literal
+from typing import List, Optional, Dict, Literal, Tuple
 import re
+import json
+import base64
 from urllib.parse import urlparse, parse_qs
-import scholarly
 import asyncio
+import time
 from datetime import datetime
+from collections import Counter
 import uuid
+import os
+
+import numpy as np
+from sqlalchemy import select, tuple_, func
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from embed_articles import (
     setup_database,
-    get_embedding,
-    Article,
+    aget_embedding,
+    aget_embeddings,
     SessionLocal,
-    process_article
+    embedding_cache
 )
-from db_models import Author
+from embedding_backends import EMBEDDING_MODEL
+from async_db import AsyncSessionLocal, get_db
+from db_models import Author, Article, ArticleAuthor, IngestJob, AuthorEdge, AuthorGraphNode
+from jobs import enqueue_job
+from export import EXPORT_FORMATS
+from matching import MatchingEngine, get_matching_engine, invalidate_matching_engine, normalize_rows
+from match_cache import MatchCache
+from data_version import VersionPoller, GRAPH
+from graph import GRAPH_K, GRAPH_MIN_SIMILARITY
+from candidates import match_candidates
+from centroids import get_centroid
+from projection import get_projection
+from search import article_author_names, article_filters, authored_by, search_articles
+from snapshot import MATCHING_SNAPSHOT, SnapshotReader
+from metrics import observe_request, register_stats, render_metrics
 
 app = FastAPI(
     title="Scholar Matching API",
@@ -25,6 +49,38 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Server processes; more than one disables auto-reload
+API_WORKERS = int(os.getenv('API_WORKERS', '1'))
+# Most queries accepted by one /search/batch call, and how many of them run
+# at once (each holds a pooled connection, see DB_POOL_SIZE)
+SEARCH_BATCH_MAX_QUERIES = int(os.getenv('SEARCH_BATCH_MAX_QUERIES', '50'))
+SEARCH_BATCH_CONCURRENCY = int(os.getenv('SEARCH_BATCH_CONCURRENCY', '4'))
+
+match_cache = MatchCache()
+corpus_version = VersionPoller()
+graph_version = VersionPoller(GRAPH)
+# Workers share one published copy of the matching matrices when configured
+matching_snapshot = SnapshotReader(MATCHING_SNAPSHOT) if MATCHING_SNAPSHOT else None
+register_stats('match_cache', match_cache.stats, counters=('hits', 'misses', 'stale', 'evictions'))
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Observe latency per route template, so path parameters don't multiply series"""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get('route')
+        observe_request(
+            request.method,
+            route.path if route else 'unmatched',
+            status,
+            time.perf_counter() - started
+        )
+
 class AuthorRequest(BaseModel):
     scholar_url: HttpUrl
 
@@ -36,12 +92,68 @@ class ArticleResponse(BaseModel):
     citations: int
     abstract: Optional[str]
     url: Optional[str]
-    author_name: str
+    author_names: List[str]
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class SearchQuery(BaseModel):
+    query: str
+    key: Optional[str] = None  # Response key, defaults to the query text
+    limit: int = 5
+    mode: Literal["vector", "text", "hybrid"] = "vector"
+    year_from: Optional[int] = None
+    year_to: Optional[int] = None
+    journal: Optional[str] = None
+    author_name: Optional[str] = None
+
+class BatchSearchRequest(BaseModel):
+    queries: List[SearchQuery]
+
+class ArticlePage(BaseModel):
+    items: List[ArticleResponse]
+    next_cursor: Optional[str]
+
+# Columns needed to build an ArticleResponse; never load the embedding just to drop it
+ARTICLE_RESPONSE_COLUMNS = [
+    Article.id,
+    Article.title,
+    Article.authors,
+    Article.year,
+    Article.journal,
+    Article.citations,
+    Article.abstract,
+    Article.url,
+    article_author_names(),
+    Article.created_at
+]
+
+class JobResponse(BaseModel):
+    id: str
+    scholar_id: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    attempts: int
+    progress: int
+    total: Optional[int]
+    error: Optional[str]
     created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
 
     class Config:
         from_attributes = True
 
+class ClusterMember(BaseModel):
+    author_id: str
+    name: str
+
+class Cluster(BaseModel):
+    community: int
+    size: int
+    top_interests: List[str]
+    authors: List[ClusterMember]
+
 class MatchReason(BaseModel):
     type: Literal["profile", "work"]
     description: str
@@ -64,7 +176,7 @@ def extract_author_id(url: str) -> str:
     parsed_url = urlparse(str(url))
     
     # Handle different URL formats
-    if 'user' in parsed_url.path:
+    if 'user' in parsed_url.query:
         # URL format: /citations?user=XXXXX
         match = re.search(r'user=([^&]+)', parsed_url.query)
         if match:
@@ -72,71 +184,34 @@ def extract_author_id(url: str) -> str:
     
     raise ValueError("Invalid Google Scholar URL format")
 
-async def process_author_publications(author_id: str):
-    """Process author publications in background"""
-    try:
-        # Search for author by ID
-        author = scholarly.search_author_id(author_id)
-        if not author:
-            raise ValueError(f"Author not found with ID: {author_id}")
-        
-        # Fill in all available author information
-        author = scholarly.fill(author)
-        
-        # Get database session
-        db = SessionLocal()
-        try:
-            for pub in author['publications']:
-                # Skip if article already exists
-                existing = db.query(Article).filter(
-                    Article.title == pub['bib'].get('title'),
-                    Article.author_name == author['name']
-                ).first()
-                
-                if existing:
-                    continue
-                
-                # Fill in publication details
-                pub_complete = scholarly.fill(pub)
-                
-                # Process article and get embedding
-                processed_article = process_article(pub_complete, author['name'])
-                
-                if processed_article['embedding'] is None:
-                    continue
-                
-                # Create new article
-                db_article = Article(**processed_article)
-                db.add(db_article)
-                db.commit()
-                
-        except Exception as e:
-            db.rollback()
-            raise e
-        finally:
-            db.close()
-            
-    except Exception as e:
-        print(f"Error processing author: {str(e)}")
-
 @app.post("/process-author/", response_model=Dict[str, str])
-async def process_author(request: AuthorRequest, background_tasks: BackgroundTasks):
+async def process_author(request: AuthorRequest):
     """
     Process a Google Scholar author profile from URL
     
     - **scholar_url**: Full Google Scholar profile URL
         Example: https://scholar.google.com/citations?user=XXXXXX
+    
+    Submitting an author that is already queued or running returns the existing job.
     """
     try:
         # Extract author ID from URL
         author_id = extract_author_id(str(request.scholar_url))
         
-        # Add task to background processing
-        background_tasks.add_task(process_author_publications, author_id)
+        # Queue the job for the ingest workers (python jobs.py)
+        job, created = await run_in_threadpool(submit_job, author_id)
+        
+        if not created:
+            return {
+                "status": f"Already {job.status}",
+                "message": "This author is already being processed",
+                "job_id": job.id
+            }
         
         return {
             "status": "Processing started",
-            "message": "Author publications are being processed in the background"
+            "message": "Author publications are being processed in the background",
+            "job_id": job.id
         }
         
     except ValueError as e:
@@ -144,62 +219,184 @@ async def process_author(request: AuthorRequest, background_tasks: BackgroundTas
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/articles/", response_model=List[ArticleResponse])
+def submit_job(author_id: str):
+    """Enqueue an ingest job; blocking, so called from the thread pool"""
+    db = SessionLocal()
+    try:
+        return enqueue_job(db, author_id)
+    finally:
+        db.close()
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, db: AsyncSession = Depends(get_db)):
+    """
+    Get the status and progress of an ingest job
+    
+    - **job_id**: ID returned by /process-author/
+    """
+    job = await db.get(IngestJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/articles/", response_model=ArticlePage)
 async def get_articles(
     author_name: Optional[str] = None,
     limit: int = 10,
-    offset: int = 0
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    Get processed articles from the database
+    Get processed articles from the database, oldest first
     
     - **author_name**: Optional filter by author name
     - **limit**: Number of articles to return (default: 10)
-    - **offset**: Number of articles to skip (default: 0)
+    - **cursor**: `next_cursor` from the previous page; omit for the first page
     """
-    db = SessionLocal()
+    query = select(*ARTICLE_RESPONSE_COLUMNS)
+    if author_name:
+        query = query.where(authored_by(author_name))
+    
+    if cursor:
+        try:
+            created_at, article_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        # Seek past the last row instead of counting with OFFSET
+        query = query.where(tuple_(Article.created_at, Article.id) > tuple_(created_at, article_id))
+    
+    rows = (await db.execute(
+        query.order_by(Article.created_at, Article.id).limit(limit + 1)
+    )).all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    
+    return ArticlePage(
+        items=[ArticleResponse.model_validate(row) for row in rows],
+        next_cursor=next_cursor
+    )
+
+def encode_cursor(created_at: datetime, article_id: int) -> str:
+    """Opaque keyset cursor for the row after which the next page starts"""
+    payload = json.dumps([created_at.isoformat(), article_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def decode_cursor(cursor: str):
     try:
-        query = db.query(Article)
-        if author_name:
-            query = query.filter(Article.author_name == author_name)
-        
-        articles = query.offset(offset).limit(limit).all()
-        return articles
-    finally:
-        db.close()
+        created_at, article_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), int(article_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {str(e)}")
+
+@app.get("/export/articles")
+def export_articles(
+    format: Literal["ndjson", "arrow"] = "ndjson",
+    author_name: Optional[str] = None,
+    since: Optional[datetime] = None
+):
+    """
+    Stream every embedded article, including its embedding
+    
+    - **format**: `ndjson` (one JSON object per line) or `arrow` (Arrow IPC stream,
+      embeddings as fixed-size float32 lists)
+    - **author_name**: Optional filter by author name
+    - **since**: Only articles created at or after this timestamp, for incremental exports
+    """
+    media_type, chunks = EXPORT_FORMATS[format]
+    # A sync generator is iterated in the thread pool, one server-side cursor batch at a time
+    return StreamingResponse(
+        chunks(author_name=author_name, since=since),
+        media_type=media_type
+    )
 
 @app.get("/search/", response_model=List[ArticleResponse])
 async def search_similar(
     query: str,
-    limit: int = 5
+    limit: int = 5,
+    mode: Literal["vector", "text", "hybrid"] = "vector",
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    journal: Optional[str] = None,
+    author_name: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    Search for similar articles using vector similarity
+    Search for similar articles
     
     - **query**: Text to search for
     - **limit**: Number of results to return (default: 5)
+    - **mode**: `vector` (embedding similarity), `text` (full-text match on title
+      and abstract) or `hybrid` (both rankings fused with reciprocal rank fusion)
+    - **year_from** / **year_to**: Optional publication year range
+    - **journal**: Optional filter by journal
+    - **author_name**: Optional filter by author name
     """
-    # Get embedding for query
-    query_embedding = get_embedding(query)
-    if not query_embedding:
-        raise HTTPException(status_code=500, detail="Error generating embedding for query")
+    filters = article_filters(year_from, year_to, journal, author_name)
+
+    # Full-text search needs no embedding
+    query_embedding = None
+    if mode != "text":
+        query_embedding = await aget_embedding(query)
+        if not query_embedding:
+            raise HTTPException(status_code=500, detail="Error generating embedding for query")
     
-    db = SessionLocal()
-    try:
-        # Using pgvector's <=> operator for cosine distance
-        similar_articles = db.query(Article).order_by(
-            Article.embedding.op('<=>')(query_embedding)
-        ).limit(limit).all()
-        
-        return similar_articles
-    finally:
-        db.close()
+    # First pass on projected vectors when a projection was trained, exact rerank after
+    projection = await db.run_sync(get_projection) if mode != "text" else None
+    # An author has few papers: rank them exactly rather than filtering the index's nearest rows
+    statement = search_articles(
+        mode, query, query_embedding, limit, ARTICLE_RESPONSE_COLUMNS, filters, projection, exact=bool(author_name)
+    )
+    similar_articles = await db.execute(statement)
+    return similar_articles.all()
+
+@app.post("/search/batch", response_model=Dict[str, List[ArticleResponse]])
+async def search_batch(request: BatchSearchRequest, db: AsyncSession = Depends(get_db)):
+    """
+    Run many searches in one call, e.g. every panel of a page
+    
+    - **queries**: Searches taking the same parameters as /search/, plus an
+      optional `key` naming their results (default: the query text)
+    
+    All queries are embedded with one batched embedding request, and their
+    SQL runs concurrently on up to SEARCH_BATCH_CONCURRENCY pooled connections.
+    Returns each query's articles under its key.
+    """
+    if len(request.queries) > SEARCH_BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {SEARCH_BATCH_MAX_QUERIES} queries per batch")
+    keys = [search.key or search.query for search in request.queries]
+    if len(set(keys)) != len(keys):
+        raise HTTPException(status_code=400, detail="Query keys must be unique; set `key` on repeated queries")
+    
+    embedded = [search for search in request.queries if search.mode != "text"]
+    embeddings = dict(zip(map(id, embedded), await aget_embeddings([search.query for search in embedded])))
+    failed = [key for key, search in zip(keys, request.queries) if id(search) in embeddings and not embeddings[id(search)]]
+    if failed:
+        raise HTTPException(status_code=500, detail=f"Error generating embedding for queries: {failed}")
+    projection = await db.run_sync(get_projection) if embedded else None
+    
+    # A session runs one statement at a time, so each search takes its own pooled connection
+    semaphore = asyncio.Semaphore(SEARCH_BATCH_CONCURRENCY)
+    
+    async def run(search: SearchQuery):
+        statement = search_articles(
+            search.mode, search.query, embeddings.get(id(search)), search.limit, ARTICLE_RESPONSE_COLUMNS,
+            article_filters(search.year_from, search.year_to, search.journal, search.author_name), projection,
+            exact=bool(search.author_name)
+        )
+        async with semaphore, AsyncSessionLocal() as session:
+            return (await session.execute(statement)).all()
+    
+    return dict(zip(keys, await asyncio.gather(*map(run, request.queries))))
 
 @app.get("/match-scholars/", response_model=List[ScholarMatch])
 async def match_scholars(
     author_id: str,
     min_similarity: float = 0.6,
-    limit: int = 5
+    limit: int = 5,
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Find matching scholars based on both profile similarity and research work
@@ -208,84 +405,179 @@ async def match_scholars(
     - **min_similarity**: Minimum overall similarity score (0-1)
     - **limit**: Maximum number of scholars to return
     """
+    # Results stay valid until ingest or a graph refresh bumps a version. A published
+    # snapshot may lag behind the corpus, so they are keyed by the version of the engine
+    # that serves them, both to look them up and to store them
+    corpus = await corpus_version.get(db)
+    graph = await graph_version.get(db)
+    snapshot = await run_in_threadpool(matching_snapshot.get) if matching_snapshot else None
+    version = (snapshot.version if snapshot is not None and snapshot.version is not None else corpus, graph)
+    cache_key = (author_id, min_similarity, limit)
+    cached = match_cache.get(cache_key, version)
+    if cached is not None:
+        return cached
+    
+    # Get target author
+    author = await db.scalar(select(Author).where(Author.id == author_id))
+    if not author:
+        raise HTTPException(status_code=404, detail="Author not found")
+    
+    # Serve from the precomputed graph when its stored edges can answer the query
+    node = await db.get(AuthorGraphNode, author_id)
+    if node is not None and limit <= GRAPH_K and (
+        node.degree >= limit or min_similarity >= GRAPH_MIN_SIMILARITY
+    ):
+        results = await graph_matches(db, author, min_similarity, limit)
+        match_cache.put(cache_key, version, results)
+        return results
+    
+    # Generate a bounded candidate set (shared interests + nearest profiles + nearest work), then
+    # score it in full; authors it can't find anything for are scored against everyone
+    work_embedding = await db.run_sync(get_centroid, author.name)
+    candidate_query = match_candidates(
+        author, work_embedding.tolist() if work_embedding is not None else None
+    )
+    candidate_ids = list(await db.scalars(candidate_query)) if candidate_query is not None else []
+    candidate_ids = candidate_ids or None
+    engine, ranked = await run_in_threadpool(
+        rank_candidates, author_id, min_similarity, limit, corpus, candidate_ids, snapshot
+    )
+    if not ranked:
+        match_cache.put(cache_key, version, [])
+        return []
+    
+    winner_ids = [engine.author_ids[row] for row, _, _, _ in ranked]
+    candidates = {
+        a.id: a for a in await db.scalars(select(Author).where(Author.id.in_(winner_ids)))
+    }
+    
+    # Fetch articles for the winners only, in a single query
+    articles_by_name: Dict[str, List[Article]] = {}
+    for author_name, article in await db.execute(select(ArticleAuthor.author_name, Article).join(
+        Article, Article.id == ArticleAuthor.article_id
+    ).where(
+        ArticleAuthor.author_name.in_([c.name for c in candidates.values()]),
+        Article.embedding.isnot(None),
+        Article.embedding_model == EMBEDDING_MODEL
+    )):
+        articles_by_name.setdefault(author_name, []).append(article)
+    
+    target_work_embedding = engine.work_centroid(author_id)
+    
+    results = []
+    for row, overall, profile_similarity, work_similarity in ranked:
+        candidate = candidates.get(engine.author_ids[row])
+        if candidate is None:
+            continue
+        results.append(build_scholar_match(
+            target_author=author,
+            target_work_embedding=target_work_embedding,
+            candidate_author=candidate,
+            candidate_articles=articles_by_name.get(candidate.name, []),
+            overall_similarity=overall,
+            profile_similarity=profile_similarity,
+            work_similarity=work_similarity
+        ))
+    
+    match_cache.put(cache_key, version, results)
+    return results
+
+async def graph_matches(db: AsyncSession, author: Author, min_similarity: float, limit: int) -> List[ScholarMatch]:
+    """Matches read from the author's stored graph edges, explained by their top paper pairs"""
+    edges = await db.execute(
+        select(AuthorEdge, Author).join(Author, Author.id == AuthorEdge.target_id).where(
+            AuthorEdge.source_id == author.id,
+            AuthorEdge.overall >= min_similarity
+        ).order_by(AuthorEdge.overall.desc()).limit(limit)
+    )
+    return [
+        build_scholar_match(
+            target_author=author,
+            target_work_embedding=None,
+            candidate_author=candidate,
+            candidate_articles=[],
+            overall_similarity=edge.overall,
+            profile_similarity=edge.profile_similarity,
+            work_similarity=edge.work_similarity,
+            relevant_works=[
+                (pair['target_title'], pair['target_year'], pair['score']) for pair in edge.top_pairs
+            ]
+        )
+        for edge, candidate in edges
+    ]
+
+def rank_candidates(
+    author_id: str,
+    min_similarity: float,
+    limit: int,
+    version: Optional[int] = None,
+    candidate_ids: Optional[List[str]] = None,
+    snapshot: Optional[MatchingEngine] = None
+):
+    """
+    Rank candidates on the given snapshot engine, or else the shared one;
+    blocking, so called from the thread pool
+
+    Only candidate_ids are scored when given; otherwise every author is.
+    """
+    def rank(engine):
+        if candidate_ids is None:
+            return engine.rank(author_id, min_similarity, limit)
+        return engine.rank_among(author_id, candidate_ids, min_similarity, limit)
+    
+    if snapshot is not None:
+        # Authors added since the last published snapshot can't be matched yet
+        if author_id not in snapshot.index:
+            return snapshot, []
+        return snapshot, rank(snapshot)
+    
     db = SessionLocal()
     try:
-        # Get target author
-        author = db.query(Author).filter(Author.id == author_id).first()
-        if not author:
-            raise HTTPException(status_code=404, detail="Author not found")
-        
-        # Get target author's articles
-        author_articles = db.query(Article).filter(
-            Article.author_name == author.name
-        ).all()
-        
-        # Combine all article embeddings for work-based matching
-        author_work_embedding = calculate_average_embedding(
-            [article.embedding for article in author_articles]
-        )
-        
-        # Find potential matches
-        potential_matches = db.query(Author).filter(
-            Author.id != author_id
-        ).all()
-        
-        results = []
-        for match in potential_matches:
-            match_data = calculate_match_scores(
-                db,
-                target_author=author,
-                target_work_embedding=author_work_embedding,
-                candidate_author=match
-            )
-            
-            if match_data['overall_similarity'] >= min_similarity:
-                results.append(match_data)
-        
-        # Sort by overall similarity and limit results
-        results.sort(key=lambda x: x['overall_similarity'], reverse=True)
-        return results[:limit]
+        engine = get_matching_engine(db, version)
+        if author_id not in engine.index:
+            # Author was added after the engine was built
+            invalidate_matching_engine()
+            engine = get_matching_engine(db, version)
+            if author_id not in engine.index:
+                return engine, []
         
+        return engine, rank(engine)
     finally:
         db.close()
 
-def calculate_average_embedding(embeddings: List[List[float]]) -> List[float]:
-    """Calculate average embedding vector"""
-    if not embeddings:
-        return None
-    
-    vector_length = len(embeddings[0])
-    avg_vector = [0.0] * vector_length
-    
-    for embedding in embeddings:
-        for i in range(vector_length):
-            avg_vector[i] += embedding[i]
-    
-    return [x / len(embeddings) for x in avg_vector]
-
-def calculate_match_scores(
-    db,
+def build_scholar_match(
     target_author: Author,
-    target_work_embedding: List[float],
-    candidate_author: Author
-) -> Dict:
-    """Calculate comprehensive matching scores and reasons"""
+    target_work_embedding: Optional[np.ndarray],
+    candidate_author: Author,
+    candidate_articles: List[Article],
+    overall_similarity: float,
+    profile_similarity: Optional[float],
+    work_similarity: Optional[float],
+    relevant_works: Optional[List[Tuple[str, Optional[int], float]]] = None
+) -> ScholarMatch:
+    """
+    Explain an already-scored match with profile and work reasons
+
+    The candidate's most relevant (title, year, score) works are found from
+    their articles, unless already known (e.g. from the similarity graph).
+    """
     
     # 1. Profile-based matching
     profile_reasons = []
-    profile_score = 1 - (candidate_author.embedding.op('<=>')(target_author.embedding))
     
-    # Research interests overlap
-    common_interests = set(target_author.interests) & set(candidate_author.interests)
+    # Research interests overlap, after normalization (case, synonyms)
+    common_interests = [
+        term for term in target_author.interest_terms if term in set(candidate_author.interest_terms)
+    ]
     if common_interests:
         profile_reasons.append(MatchReason(
             type="profile",
             description=f"Shares {len(common_interests)} research interests: {', '.join(common_interests)}",
-            score=len(common_interests) / len(target_author.interests)
+            score=len(common_interests) / len(target_author.interest_terms)
         ))
     
     # Citation impact
-    if candidate_author.citations >= target_author.citations * 0.8:
+    if target_author.citations and candidate_author.citations >= target_author.citations * 0.8:
         profile_reasons.append(MatchReason(
             type="profile",
             description=f"Similar impact with {candidate_author.citations} citations (target: {target_author.citations})",
@@ -294,66 +586,128 @@ def calculate_match_scores(
     
     # 2. Work-based matching
     work_reasons = []
-    candidate_articles = db.query(Article).filter(
-        Article.author_name == candidate_author.name
-    ).all()
     
-    candidate_work_embedding = calculate_average_embedding(
-        [article.embedding for article in candidate_articles]
-    )
+    if relevant_works is None:
+        relevant_works = []
+        if target_work_embedding is not None and candidate_articles:
+            # Find most relevant works with one matrix product over the candidate's papers
+            article_matrix = normalize_rows(np.array(
+                [article.embedding for article in candidate_articles], dtype=np.float32
+            ))
+            paper_scores = article_matrix @ target_work_embedding
+            top = np.argsort(-paper_scores, kind='stable')[:3]
+            relevant_works = [
+                (candidate_articles[i].title, candidate_articles[i].year, float(paper_scores[i]))
+                for i in top
+            ]
     
-    if candidate_work_embedding and target_work_embedding:
-        work_similarity = 1 - (candidate_work_embedding.op('<=>')(target_work_embedding))
-        
-        # Find most relevant recent works
-        relevant_works = sorted(
-            candidate_articles,
-            key=lambda x: x.embedding.op('<=>')(target_work_embedding)
-        )[:3]
+    if relevant_works and work_similarity is not None and work_similarity > 0.7:
+        work_reasons.append(MatchReason(
+            type="work",
+            description="Strong research work similarity",
+            score=work_similarity
+        ))
         
-        if work_similarity > 0.7:
+        # Add specific paper matches
+        for title, year, score in relevant_works:
             work_reasons.append(MatchReason(
                 type="work",
-                description="Strong research work similarity",
-                score=work_similarity
+                description=f"Related paper: {title} ({year})",
+                score=score
             ))
-            
-            # Add specific paper matches
-            for work in relevant_works:
-                work_reasons.append(MatchReason(
-                    type="work",
-                    description=f"Related paper: {work.title} ({work.year})",
-                    score=1 - work.embedding.op('<=>')(target_work_embedding)
-                ))
-    else:
-        work_similarity = None
-    
-    # Calculate overall similarity
-    valid_scores = [r.score for r in profile_reasons + work_reasons]
-    overall_similarity = sum(valid_scores) / len(valid_scores) if valid_scores else 0
     
     return ScholarMatch(
         author_id=candidate_author.id,
         name=candidate_author.name,
         overall_similarity=overall_similarity,
-        profile_similarity=profile_score,
+        profile_similarity=profile_similarity,
         work_similarity=work_similarity,
         h_index=candidate_author.h_index,
         citations=candidate_author.citations,
         interests=candidate_author.interests,
         match_reasons=profile_reasons + work_reasons,
-        recent_relevant_works=[w.title for w in relevant_works] if 'relevant_works' in locals() else []
+        recent_relevant_works=[title for title, _, _ in relevant_works]
     )
 
+@app.get("/clusters/", response_model=List[Cluster])
+async def get_clusters(
+    author_id: Optional[str] = None,
+    min_size: int = 2,
+    limit: int = 20,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Groups of closely related scholars, found in the precomputed similarity graph
+    
+    - **author_id**: Only return the group this author belongs to
+    - **min_size**: Smallest group to return (default: 2)
+    - **limit**: Maximum number of groups to return, largest first
+    """
+    sizes = select(
+        AuthorGraphNode.community, func.count().label('size')
+    ).group_by(AuthorGraphNode.community).having(func.count() >= min_size)
+    if author_id:
+        node = await db.get(AuthorGraphNode, author_id)
+        if node is None:
+            raise HTTPException(status_code=404, detail="Author is not in the similarity graph yet")
+        sizes = sizes.where(AuthorGraphNode.community == node.community)
+    sizes = (await db.execute(
+        sizes.order_by(func.count().desc(), AuthorGraphNode.community).limit(limit)
+    )).all()
+    if not sizes:
+        return []
+    
+    members: Dict[int, List[Author]] = {}
+    for community, member in await db.execute(
+        select(AuthorGraphNode.community, Author).join(Author, Author.id == AuthorGraphNode.author_id).where(
+            AuthorGraphNode.community.in_([community for community, _ in sizes])
+        ).order_by(Author.name)
+    ):
+        members.setdefault(community, []).append(member)
+    
+    clusters = []
+    for community, size in sizes:
+        interests = Counter(
+            interest for member in members.get(community, []) for interest in set(member.interest_terms)
+        )
+        clusters.append(Cluster(
+            community=community,
+            size=size,
+            top_interests=[interest for interest, count in interests.most_common(5) if count > 1],
+            authors=[ClusterMember(author_id=m.id, name=m.name) for m in members.get(community, [])]
+        ))
+    return clusters
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss statistics for the match result and embedding caches"""
+    snapshot = matching_snapshot.get() if matching_snapshot else None
+    return {
+        "corpus_version": corpus_version.version,
+        "graph_version": graph_version.version,
+        "snapshot_version": snapshot.version if snapshot else None,
+        "match_cache": match_cache.stats(),
+        "embedding_cache": embedding_cache.stats()
+    }
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics for this process"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize database on startup"""
-    setup_database()
+    await run_in_threadpool(setup_database)
+    if matching_snapshot:
+        # Map the snapshot up front so the first match request doesn't pay for it
+        await run_in_threadpool(matching_snapshot.get)
 
 def start():
     """Run the API server"""
     import uvicorn
-    uvicorn.run("api:app", host="0.0.0.0", port=8000, reload=True)
+    uvicorn.run("api:app", host="0.0.0.0", port=8000, workers=API_WORKERS, reload=API_WORKERS == 1)
 
 if __name__ == "__main__":
     start() 
\ No newline at end of file
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+
+import os
+from typing import AsyncIterator
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from embed_articles import DB_CONNECTION
+from metrics import instrument_engine
+from vector_index import configure_search_session
+
+# Connection pool configuration for the API process
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+
+ASYNC_DB_CONNECTION = os.getenv(
+    'ASYNC_DATABASE_URL',
+    DB_CONNECTION.replace('postgresql://', 'postgresql+asyncpg://', 1)
+)
+
+async_engine = create_async_engine(
+    ASYNC_DB_CONNECTION,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=True
+)
+configure_search_session(async_engine.sync_engine)
+instrument_engine(async_engine.sync_engine, 'async')
+
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
+
+async def get_db() -> AsyncIterator[AsyncSession]:
+    """FastAPI dependency yielding one session per request"""
+    async with AsyncSessionLocal() as session:
+        yield session
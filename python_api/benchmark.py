@@ -0,0 +1,481 @@
+#!/usr/bin/env python3
+
+import argparse
+import asyncio
+import hashlib
+import json
+import platform
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from matching import MatchingEngine, normalize_rows
+from projection import train_projection, two_stage_top_k
+from quantization import PRECISIONS, CompactMatrix
+
+DIMENSION = 1536
+
+
+def fake_embedding(text: str, dimension: int = DIMENSION) -> np.ndarray:
+    """Deterministic offline stand-in for get_embedding: a unit vector seeded by the text"""
+    seed = int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'little')
+    vector = np.random.default_rng(seed).standard_normal(dimension).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class SyntheticCorpus:
+    """
+    N authors x M articles drawn around a shared set of topics, so that
+    similarity scores have realistic structure instead of being uniform noise
+    """
+
+    def __init__(
+        self,
+        n_authors: int,
+        articles_per_author: int,
+        n_topics: int = 50,
+        dimension: int = DIMENSION,
+        seed: int = 0
+    ):
+        rng = np.random.default_rng(seed)
+        self.dimension = dimension
+        self.topics = normalize_rows(rng.standard_normal((n_topics, dimension)).astype(np.float32))
+
+        self.author_ids = [f"bench-{i}" for i in range(n_authors)]
+        self.names = [f"bench-author-{i}" for i in range(n_authors)]
+        self.author_topics = rng.integers(0, n_topics, size=(n_authors, 2))
+        self.interests = [[f"topic {t}" for t in topics] for topics in self.author_topics]
+
+        # Each article sits near one of its author's two topics
+        article_topics = self.author_topics[
+            np.repeat(np.arange(n_authors), articles_per_author),
+            rng.integers(0, 2, size=n_authors * articles_per_author)
+        ]
+        noise = rng.standard_normal((len(article_topics), dimension)).astype(np.float32) * 0.03
+        self.article_embeddings = normalize_rows(self.topics[article_topics] + noise)
+        self.article_authors = np.repeat(np.arange(n_authors), articles_per_author)
+        self.article_titles = [f"bench paper {i}" for i in range(len(article_topics))]
+
+        self.profile_embeddings = normalize_rows(
+            self.topics[self.author_topics].mean(axis=1)
+            + rng.standard_normal((n_authors, dimension)).astype(np.float32) * 0.03
+        )
+
+    @property
+    def n_articles(self) -> int:
+        return len(self.article_titles)
+
+    def work_centroids(self) -> np.ndarray:
+        """Per-author sums of article embeddings (direction equals the mean)"""
+        sums = np.zeros((len(self.author_ids), self.dimension), dtype=np.float32)
+        np.add.at(sums, self.article_authors, self.article_embeddings)
+        return sums
+
+
+def measure(fn: Callable[[int], object], iterations: int) -> Dict[str, float]:
+    """Latency percentiles (ms) and throughput of fn(i) over the given iterations"""
+    latencies = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        fn(i)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+async def ameasure(fn: Callable[[int], Awaitable], iterations: int) -> Dict[str, float]:
+    """Async variant of measure for coroutine functions, awaited one call at a time"""
+    latencies = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        await fn(i)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def summarize(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    """Percentiles of per-call latencies (ms), and throughput over the elapsed seconds"""
+    iterations = len(latencies)
+    latencies = np.array(latencies)
+    return {
+        'iterations': iterations,
+        'p50_ms': round(float(np.percentile(latencies, 50)), 4),
+        'p95_ms': round(float(np.percentile(latencies, 95)), 4),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 4),
+        'mean_ms': round(float(latencies.mean()), 4),
+        'throughput_per_s': round(iterations / elapsed, 2),
+    }
+
+
+def recall(found: List[Sequence], exact: List[Sequence]) -> float:
+    """Mean fraction of the exact top-k that was found"""
+    hits = [len(set(f) & set(e)) / len(e) for f, e in zip(found, exact) if len(e)]
+    return round(float(np.mean(hits)), 4) if hits else 1.0
+
+
+def timed(fn: Callable[[], object]) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return round((time.perf_counter() - t0) * 1000, 3)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def bench_memory(
+    corpus: SyntheticCorpus,
+    iterations: int,
+    limit: int,
+    precision: str,
+    rerank: int,
+    projection: Optional[str] = None
+) -> Dict:
+    """
+    Matching and search against in-memory NumPy structures only
+
+    The float32 results are the baseline; the same operations are repeated
+    on `precision` matrices and reported with their recall against it. With
+    a projection method, they are also repeated as a projected first pass
+    plus exact rerank of limit * rerank candidates.
+    """
+    results = {}
+
+    results['centroids_build_ms'] = timed(corpus.work_centroids)
+
+    engine = None
+
+    def build():
+        nonlocal engine
+        engine = MatchingEngine(corpus.author_ids, corpus.names, corpus.profile_embeddings, corpus.work_centroids())
+    results['engine_build_ms'] = timed(build)
+
+    n_authors = len(corpus.author_ids)
+    targets = [corpus.author_ids[i % n_authors] for i in range(iterations)]
+    exact_matches = [[row for row, _, _, _ in engine.rank(t, 0.0, limit)] for t in targets]
+    results['match'] = measure(lambda i: engine.rank(targets[i], 0.0, limit), iterations)
+
+    # Queries near the corpus topics, so that nearest neighbours are meaningful
+    rng = np.random.default_rng(1)
+    queries = normalize_rows(
+        corpus.topics[rng.integers(0, len(corpus.topics), iterations)]
+        + np.stack([fake_embedding(f"query {i}", corpus.dimension) for i in range(iterations)]) * 0.05
+    )
+    articles = corpus.article_embeddings
+    exact_search = [top_k(articles @ q, limit) for q in queries]
+    results['search'] = measure(lambda i: top_k(articles @ queries[i], limit), iterations)
+    results['article_matrix_bytes'] = int(articles.nbytes)
+
+    if precision != 'float32':
+        compact_engine = MatchingEngine(
+            corpus.author_ids, corpus.names, corpus.profile_embeddings, corpus.work_centroids(), precision
+        )
+        results['match_compact'] = measure(lambda i: compact_engine.rank(targets[i], 0.0, limit), iterations)
+        results['match_compact']['recall'] = recall(
+            [[row for row, _, _, _ in compact_engine.rank(t, 0.0, limit)] for t in targets], exact_matches
+        )
+        results['engine_bytes'] = engine.nbytes
+        results['engine_compact_bytes'] = compact_engine.nbytes
+
+        compact = CompactMatrix(articles, precision)
+
+        def search_compact(i):
+            if rerank <= 0:
+                return top_k(compact.scores(queries[i]), limit)
+            candidates = top_k(compact.scores(queries[i]), limit * rerank)
+            return candidates[top_k(articles[candidates] @ queries[i], limit)]
+        results['search_compact'] = measure(search_compact, iterations)
+        results['search_compact']['recall'] = recall(
+            [search_compact(i) for i in range(iterations)], exact_search
+        )
+        results['article_matrix_compact_bytes'] = compact.nbytes
+
+    if projection and rerank > 0:
+        trained = None
+
+        def train():
+            nonlocal trained
+            trained = train_projection(articles, projection)
+        results['projection_train_ms'] = timed(train)
+        results['projection_dimension'] = trained.dimension
+
+        projected_engine = MatchingEngine(
+            corpus.author_ids, corpus.names, corpus.profile_embeddings, corpus.work_centroids(),
+            projection=trained, rerank_factor=rerank
+        )
+        results['match_projected'] = measure(lambda i: projected_engine.rank(targets[i], 0.0, limit), iterations)
+        results['match_projected']['recall'] = recall(
+            [[row for row, _, _, _ in projected_engine.rank(t, 0.0, limit)] for t in targets], exact_matches
+        )
+
+        reduced = trained.project(articles)
+        queries_reduced = trained.project(queries)
+
+        def search_projected(i):
+            return two_stage_top_k(articles, reduced, queries[i], queries_reduced[i], limit, rerank)
+        results['search_projected'] = measure(search_projected, iterations)
+        results['search_projected']['recall'] = recall(
+            [search_projected(i) for i in range(iterations)], exact_search
+        )
+        results['article_matrix_projected_bytes'] = int(reduced.nbytes)
+
+    return results
+
+
+async def bench_api(corpus: SyntheticCorpus, iterations: int, limit: int) -> Dict:
+    """
+    End-to-end latency of the /search/ and /match-scholars/ handlers, called
+    in process through the ASGI app with query embedding stubbed by
+    fake_embedding; the match result cache is cleared before each request
+    """
+    import httpx
+    import api
+    import embed_articles
+    from async_db import async_engine
+
+    async def aget_embedding(text: str) -> List[float]:
+        return fake_embedding(text).tolist()
+
+    async def aget_embeddings(texts: List[str]) -> List[List[float]]:
+        return [fake_embedding(text).tolist() for text in texts]
+
+    stubs = {
+        'get_embedding': lambda text: fake_embedding(text).tolist(),
+        'aget_embedding': aget_embedding,
+        'aget_embeddings': aget_embeddings,
+    }
+    originals = []
+    for module in (embed_articles, api):
+        for name, stub in stubs.items():
+            if hasattr(module, name):
+                originals.append((module, name, getattr(module, name)))
+                setattr(module, name, stub)
+
+    results = {}
+    n_authors = len(corpus.author_ids)
+    try:
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            async def search(i):
+                response = await client.get("/search/", params={'query': f"query {i}", 'limit': limit})
+                response.raise_for_status()
+
+            async def match(i):
+                api.match_cache.clear()
+                response = await client.get("/match-scholars/", params={
+                    'author_id': corpus.author_ids[i % n_authors], 'min_similarity': 0.0, 'limit': limit
+                })
+                response.raise_for_status()
+
+            # The first match builds the shared engine; keep that out of the percentiles
+            await search(0)
+            await match(0)
+            results['api_search'] = await ameasure(search, iterations)
+            results['api_match'] = await ameasure(match, iterations)
+    finally:
+        for module, name, original in originals:
+            setattr(module, name, original)
+        api.match_cache.clear()
+        # Pooled connections belong to this event loop
+        await async_engine.dispose()
+    return results
+
+
+def bench_postgres(
+    corpus: SyntheticCorpus,
+    iterations: int,
+    limit: int,
+    precision: str,
+    rerank: int,
+    projection: Optional[str] = None
+) -> Dict:
+    """
+    Load the corpus into the DATABASE_URL database, then time engine builds,
+    ranking and ANN search through SQL. Rows are removed afterwards.
+
+    Search runs against the configured VECTOR_STORAGE index; its recall is
+    measured against an exact scan with index scans disabled. The API
+    handlers are timed as well (see bench_api).
+    """
+    from sqlalchemy import select, text
+    from bulk_load import bulk_insert_articles
+    from db_models import Article, ArticleAuthor, Author, AuthorCentroid
+    from embed_articles import SessionLocal, setup_database
+    from embedding_backends import EMBEDDING_MODEL
+    from fingerprints import title_key
+    from interests import normalize_interests
+    from search import nearest_articles
+    from vector_index import VECTOR_STORAGE
+
+    setup_database()
+    db = SessionLocal()
+    results = {}
+    try:
+        def load():
+            db.add_all([
+                Author(
+                    id=author_id, name=name, interests=interests,
+                    interest_terms=normalize_interests(interests), embedding=profile
+                )
+                for author_id, name, interests, profile in zip(
+                    corpus.author_ids, corpus.names, corpus.interests, corpus.profile_embeddings
+                )
+            ])
+            db.commit()
+            bulk_insert_articles(db, [
+                {
+                    'fingerprint': f"title:{title_key(title)}",
+                    'title_key': title_key(title),
+                    'title': title,
+                    'authors': corpus.names[author],
+                    'citations': 0,
+                    'embedding': embedding,
+                    'embedding_model': EMBEDDING_MODEL,
+                    'embedding_dim': DIMENSION,
+                    'author_name': corpus.names[author]
+                }
+                for title, author, embedding in zip(
+                    corpus.article_titles, corpus.article_authors, corpus.article_embeddings
+                )
+            ])
+        results['load_ms'] = timed(load)
+
+        engine = None
+
+        def build():
+            nonlocal engine
+            engine = MatchingEngine.from_database(db)
+        results['engine_build_ms'] = timed(build)
+
+        n_authors = len(corpus.author_ids)
+        results['match'] = measure(
+            lambda i: engine.rank(corpus.author_ids[i % n_authors], 0.0, limit), iterations
+        )
+
+        queries = [fake_embedding(f"query {i}") for i in range(iterations)]
+
+        def search(i):
+            return [row.id for row in db.execute(nearest_articles(queries[i], limit, rerank_factor=rerank))]
+        results['search'] = measure(search, iterations)
+        results['vector_storage'] = VECTOR_STORAGE
+
+        db.commit()
+        db.execute(text("SET LOCAL enable_indexscan = off"))
+        exact = [
+            [row.id for row in db.execute(
+                select(Article.id).order_by(Article.embedding.cosine_distance(q)).limit(limit)
+            )]
+            for q in queries
+        ]
+        db.commit()
+        results['search']['recall'] = recall([search(i) for i in range(iterations)], exact)
+
+        results.update(asyncio.run(bench_api(corpus, iterations, limit)))
+    finally:
+        db.rollback()
+        db.query(Article).filter(Article.id.in_(
+            select(ArticleAuthor.article_id).where(ArticleAuthor.author_name.in_(corpus.names))
+        )).delete(synchronize_session=False)
+        db.query(AuthorCentroid).filter(AuthorCentroid.author_name.in_(corpus.names)).delete(synchronize_session=False)
+        db.query(Author).filter(Author.id.in_(corpus.author_ids)).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+    return results
+
+
+BACKENDS = {
+    'memory': bench_memory,
+    'postgres': bench_postgres,
+}
+
+
+def compare(current: Dict, previous: Dict):
+    """Print p50/p95 ratios against a previous run of the same sizes"""
+    previous_runs = {(r['backend'], r['authors'], r['articles_per_author']): r for r in previous['runs']}
+    for run in current['runs']:
+        before = previous_runs.get((run['backend'], run['authors'], run['articles_per_author']))
+        if not before:
+            continue
+        for section in ('match', 'search', 'api_match', 'api_search'):
+            if section not in run or section not in before:
+                continue
+            for metric in ('p50_ms', 'p95_ms'):
+                old, new = before[section][metric], run[section][metric]
+                ratio = new / old if old else float('inf')
+                flag = "  REGRESSION" if ratio > 1.2 else ""
+                print(f"{run['backend']} {run['authors']}x{run['articles_per_author']} "
+                      f"{section} {metric}: {old:.3f} -> {new:.3f} ({ratio:.2f}x){flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark matching and search on synthetic corpora")
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='memory')
+    parser.add_argument('--authors', default='100,1000,5000', help="Comma-separated author counts")
+    parser.add_argument('--articles', type=int, default=20, help="Articles per author")
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--limit', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--precision', choices=PRECISIONS, default='int8',
+                        help="Compact precision compared against float32 (memory backend)")
+    parser.add_argument('--rerank', type=int, default=4,
+                        help="Candidates per result reranked at full precision (0: no rerank)")
+    parser.add_argument('--projection', choices=('pca', 'random'),
+                        help="Also benchmark a projected first pass with this method (memory backend)")
+    parser.add_argument('--output', help="Results file (default: bench_results/<timestamp>.json)")
+    parser.add_argument('--compare', help="Previous results file to compare against")
+    args = parser.parse_args()
+
+    report = {
+        'created_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'runs': []
+    }
+
+    for n_authors in [int(n) for n in args.authors.split(',')]:
+        corpus = SyntheticCorpus(n_authors, args.articles, seed=args.seed)
+        print(f"{args.backend}: {n_authors} authors x {args.articles} articles ({corpus.n_articles} total)")
+        run = BACKENDS[args.backend](
+            corpus, args.iterations, args.limit, args.precision, args.rerank, args.projection
+        )
+        run.update({
+            'backend': args.backend,
+            'authors': n_authors,
+            'articles_per_author': args.articles,
+        })
+        print(f"  match  p50 {run['match']['p50_ms']:.3f} ms  p95 {run['match']['p95_ms']:.3f} ms  "
+              f"{run['match']['throughput_per_s']:.0f}/s")
+        print(f"  search p50 {run['search']['p50_ms']:.3f} ms  p95 {run['search']['p95_ms']:.3f} ms  "
+              f"{run['search']['throughput_per_s']:.0f}/s")
+        for section in ('api_match', 'api_search'):
+            if section in run:
+                print(f"  {section} p50 {run[section]['p50_ms']:.3f} ms  p95 {run[section]['p95_ms']:.3f} ms  "
+                      f"{run[section]['throughput_per_s']:.0f}/s")
+        for section in ('match_compact', 'search_compact'):
+            if section in run:
+                print(f"  {section} ({args.precision}) p50 {run[section]['p50_ms']:.3f} ms  "
+                      f"recall@{args.limit} {run[section]['recall']:.3f}")
+        for section in ('match_projected', 'search_projected'):
+            if section in run:
+                print(f"  {section} ({args.projection}, {run['projection_dimension']} dims) "
+                      f"p50 {run[section]['p50_ms']:.3f} ms  recall@{args.limit} {run[section]['recall']:.3f}")
+        report['runs'].append(run)
+
+    output = Path(args.output or f"bench_results/{datetime.now():%Y%m%d-%H%M%S}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results saved to {output}")
+
+    if args.compare:
+        compare(report, json.loads(Path(args.compare).read_text()))
+
+
+if __name__ == "__main__":
+    main()
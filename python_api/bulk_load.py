@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+
+import os
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import bindparam, or_, select
+from sqlalchemy.dialects.postgresql import insert
+
+from db_models import Article, ArticleAuthor
+from centroids import add_to_centroid
+from embedding_backends import EMBEDDING_MODEL
+from fingerprints import has_doi
+from metrics import count_articles, stage_timer
+
+# Rows per INSERT statement and per commit
+BULK_INSERT_CHUNK_SIZE = int(os.getenv('BULK_INSERT_CHUNK_SIZE', '500'))
+
+# Keep IN (...) lists well below driver/statement limits
+_LOOKUP_CHUNK_SIZE = 5000
+
+# Columns of the canonical article row; records also carry author_name and article_id
+ARTICLE_COLUMNS = (
+    'fingerprint', 'title_key', 'title', 'authors', 'year', 'journal', 'citations',
+    'abstract', 'url', 'embedding', 'embedding_model', 'embedding_dim', 'embedding_reduced',
+    'projection_version'
+)
+
+
+def linked_keys(db, author_name: str, keys: Iterable[str]) -> Set[str]:
+    """Title keys from the given set whose article is already linked to the author"""
+    keys = list({k for k in keys if k is not None})
+    found = set()
+    for start in range(0, len(keys), _LOOKUP_CHUNK_SIZE):
+        chunk = keys[start:start + _LOOKUP_CHUNK_SIZE]
+        found.update(
+            key for key, in db.query(Article.title_key).join(
+                ArticleAuthor, ArticleAuthor.article_id == Article.id
+            ).filter(
+                ArticleAuthor.author_name == author_name,
+                Article.title_key.in_(chunk)
+            )
+        )
+    return found
+
+
+def find_articles(db, fingerprints: Iterable[str] = (), title_keys: Iterable[str] = ()) -> Dict[str, int]:
+    """
+    Ids of stored articles, keyed by whichever given fingerprint or title key
+    matched (the two kinds of key never collide)
+
+    Title keys only match articles without a DOI: an editorial, an erratum
+    or a preprint can share its title and year with a different paper, so
+    a title match can't override a DOI. Callers likewise only fall back to
+    the title key for records without a DOI (see resolve_article).
+    """
+    fingerprints = list(set(fingerprints))
+    title_keys = list(set(title_keys))
+    found = {}
+    for start in range(0, max(len(fingerprints), len(title_keys)), _LOOKUP_CHUNK_SIZE):
+        fingerprint_chunk = fingerprints[start:start + _LOOKUP_CHUNK_SIZE]
+        title_key_chunk = title_keys[start:start + _LOOKUP_CHUNK_SIZE]
+        for article_id, fingerprint, title_key in db.query(Article.id, Article.fingerprint, Article.title_key).filter(
+            or_(Article.fingerprint.in_(fingerprint_chunk), Article.title_key.in_(title_key_chunk))
+        ):
+            found[fingerprint] = article_id
+            if not has_doi(fingerprint):
+                found.setdefault(title_key, article_id)
+    return found
+
+
+def resolve_article(known: Dict[str, int], fingerprint: str, title_key: str) -> Optional[int]:
+    """Stored article id for a record from find_articles results, by fingerprint, or title key if it has no DOI"""
+    if has_doi(fingerprint):
+        return known.get(fingerprint)
+    return known.get(fingerprint) or known.get(title_key)
+
+
+def link_articles(db, author_name: str, article_ids: Iterable[int]) -> int:
+    """
+    Record the author on stored articles (caller commits)
+
+    Articles newly linked to the author are folded into their centroid.
+
+    Returns:
+        int: Number of new links
+    """
+    article_ids = list(set(article_ids))
+    if not article_ids:
+        return 0
+    linked = [
+        article_id for article_id, in db.execute(
+            insert(ArticleAuthor).values([
+                {'article_id': article_id, 'author_name': author_name} for article_id in article_ids
+            ]).on_conflict_do_nothing().returning(ArticleAuthor.article_id)
+        )
+    ]
+    if linked:
+        add_to_centroid(db, author_name, [
+            embedding for embedding, in db.query(Article.embedding).filter(
+                Article.id.in_(linked),
+                Article.embedding_model == EMBEDDING_MODEL
+            )
+        ])
+    return len(linked)
+
+
+def bulk_insert_articles(db, rows: List[Dict], chunk_size: int = None) -> int:
+    """
+    Store article records and link them to their authors
+
+    Records resolve to a stored article by article_id, fingerprint or title
+    key; only papers that aren't stored yet are inserted, with multi-row
+    INSERT ... ON CONFLICT (fingerprint) DO NOTHING. Each chunk is committed
+    together with the centroid updates for the links it added, so a crashed
+    load can simply be re-run.
+
+    Returns:
+        int: Number of new author-article links
+    """
+    chunk_size = chunk_size or BULK_INSERT_CHUNK_SIZE
+    linked = 0
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        known = find_articles(
+            db,
+            [row['fingerprint'] for row in chunk if not row.get('article_id')],
+            [row['title_key'] for row in chunk if not row.get('article_id')]
+        )
+
+        def resolve(row):
+            return row.get('article_id') or resolve_article(known, row['fingerprint'], row['title_key'])
+
+        # Papers seen for the first time, once each even if several records share them
+        new_rows = {}
+        for row in chunk:
+            if not resolve(row) and row.get('embedding') is not None:
+                new_rows.setdefault(row['fingerprint'], {column: row.get(column) for column in ARTICLE_COLUMNS})
+        inserted = 0
+        if new_rows:
+            for article_id, fingerprint in db.execute(
+                insert(Article).values(list(new_rows.values())).on_conflict_do_nothing(
+                    index_elements=['fingerprint']
+                ).returning(Article.id, Article.fingerprint)
+            ):
+                known[fingerprint] = article_id
+                inserted += 1
+            # Rows another writer inserted meanwhile
+            missing = [fingerprint for fingerprint in new_rows if fingerprint not in known]
+            if missing:
+                known.update(find_articles(db, missing))
+
+        ids_by_author: Dict[str, List[int]] = defaultdict(list)
+        for row in chunk:
+            article_id = resolve(row)
+            if article_id:
+                ids_by_author[row['author_name']].append(article_id)
+        chunk_linked = sum(
+            link_articles(db, author_name, article_ids)
+            for author_name, article_ids in ids_by_author.items()
+        )
+
+        with stage_timer('db_commit'):
+            db.commit()
+        count_articles('ingested', inserted)
+        count_articles('deduplicated', chunk_linked - inserted)
+        count_articles('skipped', len(chunk) - chunk_linked)
+        linked += chunk_linked
+    return linked
+
+
+def update_article_citations(db, author_name: str, citations: Dict[str, int]) -> int:
+    """
+    Set citation counts of the author's articles by title key, in one
+    executemany (caller commits); other papers sharing a title key are left alone
+    """
+    if not citations:
+        return 0
+    table = Article.__table__
+    db.execute(
+        table.update().where(
+            table.c.title_key == bindparam('b_title_key'),
+            table.c.id.in_(
+                select(ArticleAuthor.article_id).where(ArticleAuthor.author_name == author_name)
+            )
+        ).values(citations=bindparam('b_citations')),
+        [
+            {'b_title_key': key, 'b_citations': count}
+            for key, count in citations.items()
+        ]
+    )
+    return len(citations)
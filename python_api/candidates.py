@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+import os
+from typing import Optional, Sequence
+
+from sqlalchemy import ARRAY, String, cast, func, select, union
+
+from db_models import Author, AuthorCentroid
+from embedding_backends import EMBEDDING_MODEL
+from search import index_distance
+from vector_index import ann_candidates
+
+# Candidates generated per match from each source; only these are scored in
+# full, so match latency doesn't grow with the author table. 0 turns a source off.
+MATCH_INTEREST_CANDIDATES = int(os.getenv('MATCH_INTEREST_CANDIDATES', '200'))
+MATCH_ANN_CANDIDATES = int(os.getenv('MATCH_ANN_CANDIDATES', '200'))
+MATCH_WORK_CANDIDATES = int(os.getenv('MATCH_WORK_CANDIDATES', '200'))
+
+
+def interest_candidates(author: Author, limit: int = MATCH_INTEREST_CANDIDATES):
+    """
+    SELECT of authors sharing a normalized interest with the author, most
+    shared interests first (the && filter is served by the GIN index)
+    """
+    terms = list(author.interest_terms or [])
+    term = func.unnest(Author.interest_terms).column_valued('term')
+    shared = select(func.count()).where(term.in_(terms)).correlate(Author).scalar_subquery()
+    return select(Author.id).where(
+        Author.interest_terms.op('&&')(cast(terms, ARRAY(String))),
+        Author.id != author.id
+    ).order_by(shared.desc(), Author.citations.desc(), Author.id).limit(limit)
+
+
+def profile_candidates(author: Author, limit: int = MATCH_ANN_CANDIDATES):
+    """SELECT of the authors nearest to the author's profile vector, from the ANN index"""
+    return ann_candidates(select(Author.id).where(
+        Author.embedding_model == EMBEDDING_MODEL,
+        Author.id != author.id
+    ).order_by(index_distance(Author.embedding, author.embedding)).limit(limit), limit)
+
+
+def work_candidates(author: Author, work_embedding: Sequence[float], limit: int = MATCH_WORK_CANDIDATES):
+    """
+    SELECT of the authors whose work centroid is nearest to the author's,
+    from the ANN index on author_centroids (keyed by name, like articles)
+    """
+    nearest = select(AuthorCentroid.author_name).where(
+        AuthorCentroid.article_count > 0,
+        AuthorCentroid.author_name != author.name
+    ).order_by(index_distance(AuthorCentroid.embedding, work_embedding)).limit(limit)
+    return ann_candidates(select(Author.id).where(
+        Author.name.in_(nearest),
+        Author.id != author.id
+    ), limit)
+
+
+def match_candidates(
+    author: Author,
+    work_embedding: Optional[Sequence[float]] = None,
+    interest_limit: int = MATCH_INTEREST_CANDIDATES,
+    ann_limit: int = MATCH_ANN_CANDIDATES,
+    work_limit: int = MATCH_WORK_CANDIDATES
+):
+    """
+    SELECT of the ids worth scoring against the author: interest-overlap
+    hits united with ANN hits on the profile vector and on the work
+    centroid (see centroids.get_centroid), or None when the author has none
+    of them to generate candidates from
+    """
+    sources = []
+    if interest_limit > 0 and author.interest_terms:
+        sources.append(interest_candidates(author, interest_limit))
+    if ann_limit > 0 and author.embedding is not None and author.embedding_model == EMBEDDING_MODEL:
+        sources.append(profile_candidates(author, ann_limit))
+    if work_limit > 0 and work_embedding is not None:
+        sources.append(work_candidates(author, work_embedding, work_limit))
+    if not sources:
+        return None
+    if len(sources) == 1:
+        return sources[0]
+    # Execution options of the parts don't carry over to the union
+    return ann_candidates(
+        union(*(source.subquery().select() for source in sources)), max(ann_limit, work_limit)
+    )
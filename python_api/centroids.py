@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+import argparse
+from typing import List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+
+from db_models import AuthorCentroid, Article, ArticleAuthor
+from data_version import bump_data_version
+from embedding_backends import EMBEDDING_MODEL
+
+
+def _normalized(vector: np.ndarray) -> np.ndarray:
+    """Unit-length copy of a vector (zero vectors are returned unchanged)"""
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+def add_to_centroid(db, author_name: str, embeddings: Sequence[Sequence[float]]):
+    """
+    Fold newly inserted article embeddings into the author's stored centroid
+
+    Runs inside the caller's transaction so the centroid is committed together
+    with the articles it was updated for.
+
+    Args:
+        db: SQLAlchemy session
+        author_name (str): Author the articles were inserted for
+        embeddings: Embeddings of the new articles
+    """
+    embeddings = [e for e in embeddings if e is not None]
+    if not embeddings:
+        return
+
+    added = np.asarray(embeddings, dtype=np.float64).sum(axis=0)
+
+    # Make sure a row exists, then lock it so concurrent ingests don't lose updates
+    db.execute(
+        insert(AuthorCentroid).values(
+            author_name=author_name,
+            embedding_sum=np.zeros_like(added),
+            article_count=0,
+            embedding=np.zeros_like(added)
+        ).on_conflict_do_nothing(index_elements=['author_name'])
+    )
+    centroid = db.query(AuthorCentroid).filter(
+        AuthorCentroid.author_name == author_name
+    ).with_for_update().populate_existing().one()
+
+    new_sum = np.asarray(centroid.embedding_sum, dtype=np.float64) + added
+    centroid.embedding_sum = new_sum
+    centroid.article_count += len(embeddings)
+    centroid.embedding = _normalized(new_sum)
+    bump_data_version(db)
+
+
+def get_centroid(db, author_name: str) -> Optional[np.ndarray]:
+    """Stored normalized work centroid for an author, if any"""
+    centroid = db.query(AuthorCentroid.embedding).filter(
+        AuthorCentroid.author_name == author_name,
+        AuthorCentroid.article_count > 0
+    ).first()
+    return np.asarray(centroid.embedding) if centroid else None
+
+
+def backfill_centroids(db, author_names: Optional[List[str]] = None) -> int:
+    """
+    Recompute centroids from the articles linked to each author
+
+    Streams (author, article) links ordered by author so only one running sum is held in memory.
+    Only embeddings of the current model count; a full backfill drops the
+    centroids of authors left without any, e.g. after switching models.
+
+    Returns:
+        int: Number of authors whose centroid was written
+    """
+    query = db.query(ArticleAuthor.author_name, Article.embedding).join(
+        Article, Article.id == ArticleAuthor.article_id
+    ).filter(
+        Article.embedding.isnot(None),
+        Article.embedding_model == EMBEDDING_MODEL
+    )
+    if author_names:
+        query = query.filter(ArticleAuthor.author_name.in_(author_names))
+        db.query(AuthorCentroid).filter(
+            AuthorCentroid.author_name.in_(author_names)
+        ).delete(synchronize_session=False)
+    else:
+        db.query(AuthorCentroid).delete(synchronize_session=False)
+
+    def write(name, total, count):
+        db.execute(
+            insert(AuthorCentroid).values(
+                author_name=name,
+                embedding_sum=total,
+                article_count=count,
+                embedding=_normalized(total)
+            ).on_conflict_do_update(
+                index_elements=['author_name'],
+                set_={
+                    'embedding_sum': total,
+                    'article_count': count,
+                    'embedding': _normalized(total),
+                    'updated_at': func.now()
+                }
+            )
+        )
+
+    written = 0
+    current, total, count = None, None, 0
+    for name, embedding in query.order_by(ArticleAuthor.author_name).yield_per(1000):
+        if name != current:
+            if current is not None:
+                write(current, total, count)
+                written += 1
+            current, total, count = name, np.zeros(len(embedding)), 0
+        total += np.asarray(embedding, dtype=np.float64)
+        count += 1
+
+    if current is not None:
+        write(current, total, count)
+        written += 1
+
+    bump_data_version(db)
+    db.commit()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain per-author work centroids")
+    parser.add_argument('--backfill', action='store_true', help="Recompute centroids from existing articles")
+    parser.add_argument('--author', action='append', help="Limit the backfill to this author name (repeatable)")
+    args = parser.parse_args()
+
+    if not args.backfill:
+        parser.print_help()
+        return
+
+    from embed_articles import setup_database, SessionLocal
+
+    setup_database()
+    db = SessionLocal()
+    try:
+        written = backfill_centroids(db, args.author)
+        print(f"Backfilled centroids for {written} authors")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
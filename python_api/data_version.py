@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+import os
+import time
+
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert
+
+from db_models import DataVersion
+
+# Version covering everything matching reads: authors, articles and centroids
+CORPUS = 'corpus'
+# Version of the precomputed author similarity graph, bumped by each refresh
+GRAPH = 'graph'
+
+# How long API processes trust their last read of the version (seconds)
+DATA_VERSION_POLL_SECONDS = float(os.getenv('DATA_VERSION_POLL_SECONDS', '1'))
+
+
+def bump_data_version(db, name: str = CORPUS):
+    """Increment a version inside the caller's transaction"""
+    db.execute(
+        insert(DataVersion).values(name=name, version=1).on_conflict_do_update(
+            index_elements=['name'],
+            set_={'version': DataVersion.version + 1, 'updated_at': func.now()}
+        )
+    )
+
+
+def get_data_version(db, name: str = CORPUS) -> int:
+    """Current version (0 before anything was written)"""
+    return db.scalar(select(DataVersion.version).where(DataVersion.name == name)) or 0
+
+
+class VersionPoller:
+    """
+    Caches the corpus version for DATA_VERSION_POLL_SECONDS so hot paths pay
+    for at most one tiny query per interval instead of one per request
+    """
+
+    def __init__(self, name: str = CORPUS, interval: float = DATA_VERSION_POLL_SECONDS):
+        self.name = name
+        self.interval = interval
+        self.version = None
+        self._checked = 0.0
+
+    async def get(self, db) -> int:
+        """Version as seen through an AsyncSession"""
+        if self.version is None or time.monotonic() - self._checked > self.interval:
+            self.version = await db.scalar(
+                select(DataVersion.version).where(DataVersion.name == self.name)
+            ) or 0
+            self._checked = time.monotonic()
+        return self.version
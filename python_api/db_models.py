@@ -1,27 +1,99 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, ARRAY, TIMESTAMP, func, ForeignKey
-from sqlalchemy.orm import declarative_base, relationship
+from sqlalchemy import create_engine, Column, Computed, Integer, BigInteger, Float, String, Text, ARRAY, TIMESTAMP, ForeignKey, LargeBinary, func, Index, text
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.orm import declarative_base, deferred, relationship
 from pgvector.sqlalchemy import Vector
 
+from vector_index import PROJECTION_DIMENSION
+
 Base = declarative_base()
 
+# Text search configuration of articles.search_vector; queries must use the same one
+TEXT_SEARCH_CONFIG = 'english'
+ARTICLE_SEARCH_VECTOR = (
+    f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(abstract, '')), 'B')"
+)
+
 class Author(Base):
     __tablename__ = 'authors'
+    __table_args__ = (
+        # Interest-overlap candidates for matching (interest_terms && ...)
+        Index('authors_interest_terms_idx', 'interest_terms', postgresql_using='gin'),
+    )
     
     id = Column(String, primary_key=True)
     name = Column(String, nullable=False, index=True)
     interests = Column(ARRAY(String), nullable=False)
+    # Canonical forms of the interests (see interests.py), maintained on ingest
+    interest_terms = Column(ARRAY(String), nullable=False, server_default='{}')
     citations = Column(Integer, nullable=False, default=0)
     h_index = Column(Integer, nullable=False, default=0)
     i10_index = Column(Integer, nullable=False, default=0)
-    embedding = Column(Vector(1536))
+    embedding = Column(Vector(1536))  # Profile vector composed by profiles.py
+    # What the profile vector was built from; a mismatch marks it stale
+    embedding_model = Column(String)
+    embedding_interests = Column(ARRAY(String))
+    embedding_updated_at = Column(TIMESTAMP(timezone=True))
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     
-    articles = relationship("Article", back_populates="author")
+    articles = relationship(
+        "Article",
+        secondary="article_authors",
+        primaryjoin="Author.name == foreign(ArticleAuthor.author_name)",
+        secondaryjoin="foreign(ArticleAuthor.article_id) == Article.id",
+        back_populates="linked_authors",
+        viewonly=True
+    )
+
+class InterestTerm(Base):
+    __tablename__ = 'interest_vocabulary'
+    
+    # One embedding per distinct normalized interest and model, shared by every author listing it
+    term = Column(String, primary_key=True)
+    embedding_model = Column(String, primary_key=True)
+    embedding = Column(Vector(1536), nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+
+class EmbeddingProjection(Base):
+    __tablename__ = 'embedding_projections'
+    
+    # Trained projection to PROJECTION_DIMENSION dims, one per embedding model
+    embedding_model = Column(String, primary_key=True)
+    method = Column(String, nullable=False)  # 'pca' or 'random'
+    dimension = Column(Integer, nullable=False)
+    mean = Column(LargeBinary, nullable=False)  # float32 vector subtracted before projecting
+    components = Column(LargeBinary, nullable=False)  # float32 (dimension x 1536) matrix
+    trained_on = Column(Integer, nullable=False, default=0)  # Sample size
+    version = Column(Integer, nullable=False, default=1)  # New on every retrain, stamped on the rows it projected
+    recall = Column(Float)  # Recall@k of search through it (projection.py --evaluate); NULL until measured
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+
+class AuthorCentroid(Base):
+    __tablename__ = 'author_centroids'
+    
+    author_name = Column(String, primary_key=True)
+    embedding_sum = Column(Vector(1536), nullable=False)
+    article_count = Column(Integer, nullable=False, default=0)
+    embedding = Column(Vector(1536), nullable=False)  # Normalized mean of the author's article embeddings
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
 
 class Article(Base):
     __tablename__ = 'articles'
+    __table_args__ = (
+        # Keyset pagination on (created_at, id)
+        Index('articles_created_at_id_idx', 'created_at', 'id'),
+        # Full-text half of hybrid search, and its filters
+        Index('articles_search_vector_idx', 'search_vector', postgresql_using='gin'),
+        Index('articles_year_idx', 'year'),
+        Index('articles_journal_idx', 'journal'),
+        # Rows not yet projected with the current projection, searched exactly
+        Index('articles_projection_version_idx', 'projection_version'),
+    )
     
+    # One row per distinct paper, however many of our authors wrote it (see fingerprints.py)
     id = Column(Integer, primary_key=True, autoincrement=True)
+    fingerprint = Column(String, nullable=False, unique=True)  # DOI, else normalized title + year
+    title_key = Column(String, nullable=False, index=True)  # Normalized title + year, known before filling
     title = Column(String, nullable=False, index=True)
     authors = Column(String, nullable=False)
     year = Column(Integer)
@@ -30,7 +102,116 @@ class Article(Base):
     abstract = Column(Text)
     url = Column(String)
     embedding = Column(Vector(1536))
-    author_name = Column(String, ForeignKey('authors.name'), nullable=False, index=True)
+    # Model that produced the embedding and its own dimension (shorter vectors are zero-padded)
+    embedding_model = Column(String)
+    embedding_dim = Column(Integer)
+    # The embedding under the model's projection, for first-pass search (see projection.py)
+    embedding_reduced = deferred(Column(Vector(PROJECTION_DIMENSION)))
+    projection_version = Column(Integer)  # Version of the projection embedding_reduced came from
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+    # Maintained by Postgres; titles weigh more than abstracts. Deferred so entity loads skip it.
+    search_vector = deferred(Column(TSVECTOR, Computed(ARTICLE_SEARCH_VECTOR, persisted=True)))
+    
+    # authors.name isn't unique, so the join goes through article_authors by name
+    linked_authors = relationship(
+        "Author",
+        secondary="article_authors",
+        primaryjoin="Article.id == foreign(ArticleAuthor.article_id)",
+        secondaryjoin="foreign(ArticleAuthor.author_name) == Author.name",
+        back_populates="articles",
+        viewonly=True
+    )
+
+class ArticleAuthor(Base):
+    __tablename__ = 'article_authors'
+    __table_args__ = (
+        # An author's articles, in the order they were linked
+        Index('article_authors_author_name_idx', 'author_name', 'article_id'),
+    )
+    
+    # Authorship of a canonical article by one of our authors, by name like author_centroids
+    article_id = Column(Integer, ForeignKey('articles.id', ondelete='CASCADE'), primary_key=True)
+    author_name = Column(String, primary_key=True)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+
+class IngestJob(Base):
+    __tablename__ = 'ingest_jobs'
+    __table_args__ = (
+        # At most one queued or running job per scholar
+        Index(
+            'ingest_jobs_active_scholar_idx', 'scholar_id', unique=True,
+            postgresql_where=text("status IN ('queued', 'running')")
+        ),
+        Index('ingest_jobs_claim_idx', 'status', 'run_after'),
+    )
+    
+    id = Column(String, primary_key=True)
+    scholar_id = Column(String, nullable=False)
+    status = Column(String, nullable=False, default='queued')  # queued, running, succeeded, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    progress = Column(Integer, nullable=False, default=0)  # Publications written so far
+    total = Column(Integer)  # New publications found for the author
+    error = Column(Text)
+    locked_by = Column(String)
+    run_after = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
+    heartbeat_at = Column(TIMESTAMP(timezone=True))
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+    started_at = Column(TIMESTAMP(timezone=True))
+    finished_at = Column(TIMESTAMP(timezone=True))
+
+class AuthorSyncState(Base):
+    __tablename__ = 'author_sync_state'
+    
+    # What the last sync of a Google Scholar profile saw (see sync.py)
+    scholar_id = Column(String, primary_key=True)
+    author_name = Column(String)
+    citedby = Column(Integer)  # Profile citation total, compared before listing publications again
+    publication_count = Column(Integer, nullable=False, default=0)
+    # Stored publications: {author_pub_id: num_citations}
+    publications = Column(JSONB, nullable=False, default=dict)
+    last_synced_at = Column(TIMESTAMP(timezone=True))
+    listed_at = Column(TIMESTAMP(timezone=True))  # Last full walk of the publication list
+    last_changed_at = Column(TIMESTAMP(timezone=True))
+    # Grows while syncs find nothing new, resets when they do
+    sync_interval_seconds = Column(Float, nullable=False)
+    next_sync_at = Column(TIMESTAMP(timezone=True), nullable=False, index=True)
+
+class DataVersion(Base):
+    __tablename__ = 'data_versions'
+    
+    # Monotonic counters bumped in the same transaction as the writes they describe
+    name = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class AuthorEdge(Base):
+    __tablename__ = 'author_edges'
+    __table_args__ = (
+        # Serves "neighbours of X, best first"
+        Index('author_edges_source_overall_idx', 'source_id', text('overall DESC')),
+        Index('author_edges_target_idx', 'target_id'),
+    )
+    
+    # One of the source author's k nearest neighbours in the similarity graph
+    source_id = Column(String, ForeignKey('authors.id', ondelete='CASCADE'), primary_key=True)
+    target_id = Column(String, ForeignKey('authors.id', ondelete='CASCADE'), primary_key=True)
+    rank = Column(Integer, nullable=False)
+    overall = Column(Float, nullable=False)
+    profile_similarity = Column(Float)
+    work_similarity = Column(Float)
+    # Most similar (source paper, target paper) pairs: [{source_title, target_title, target_year, score}]
+    top_pairs = Column(JSONB, nullable=False, default=list)
+    computed_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+
+class AuthorGraphNode(Base):
+    __tablename__ = 'author_graph_nodes'
     
-    author = relationship("Author", back_populates="articles")
\ No newline at end of file
+    author_id = Column(String, ForeignKey('authors.id', ondelete='CASCADE'), primary_key=True)
+    community = Column(Integer, index=True)
+    degree = Column(Integer, nullable=False, default=0)  # Stored edges, at most GRAPH_K
+    # Lowest stored edge score, or GRAPH_MIN_SIMILARITY while the node has fewer than k edges
+    kth_similarity = Column(Float, nullable=False)
+    # Stored article count when the edges were computed; a different count marks the node stale
+    article_count = Column(Integer, nullable=False, default=0)
+    computed_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
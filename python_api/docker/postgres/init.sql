@@ -12,16 +12,31 @@ CREATE TABLE authors (
     id VARCHAR PRIMARY KEY,
     name VARCHAR NOT NULL,
     interests VARCHAR[] NOT NULL,
+    interest_terms VARCHAR[] NOT NULL DEFAULT '{}',
     citations INTEGER NOT NULL DEFAULT 0,
     h_index INTEGER NOT NULL DEFAULT 0,
     i10_index INTEGER NOT NULL DEFAULT 0,
     embedding vector(1536),
+    embedding_model VARCHAR,
+    embedding_interests VARCHAR[],
+    embedding_updated_at TIMESTAMP WITH TIME ZONE,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Create the interest embedding vocabulary behind author profile vectors (see profiles.py)
+CREATE TABLE interest_vocabulary (
+    term VARCHAR,
+    embedding_model VARCHAR,
+    embedding vector(1536) NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (term, embedding_model)
+);
+
 -- Create the articles table
 CREATE TABLE articles (
     id SERIAL PRIMARY KEY,
+    fingerprint VARCHAR NOT NULL,
+    title_key VARCHAR NOT NULL,
     title VARCHAR NOT NULL,
     authors VARCHAR NOT NULL,
     year INTEGER,
@@ -30,11 +45,129 @@ CREATE TABLE articles (
     abstract TEXT,
     url VARCHAR,
     embedding vector(1536),
-    author_name VARCHAR NOT NULL,
+    embedding_model VARCHAR,
+    embedding_dim INTEGER,
+    embedding_reduced vector(128),
+    projection_version INTEGER,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(abstract, '')), 'B')
+    ) STORED,
+    CONSTRAINT articles_fingerprint_key UNIQUE (fingerprint)
+);
+
+-- Create the authorship links of the deduplicated articles (see fingerprints.py)
+CREATE TABLE article_authors (
+    article_id INTEGER REFERENCES articles(id) ON DELETE CASCADE,
+    author_name VARCHAR,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (article_id, author_name)
+);
+
+-- Create the trained projections behind first-pass search on embedding_reduced (see projection.py)
+CREATE TABLE embedding_projections (
+    embedding_model VARCHAR PRIMARY KEY,
+    method VARCHAR NOT NULL,
+    dimension INTEGER NOT NULL,
+    mean BYTEA NOT NULL,
+    components BYTEA NOT NULL,
+    trained_on INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 1,
+    recall DOUBLE PRECISION,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Create the per-author work centroid table
+CREATE TABLE author_centroids (
+    author_name VARCHAR PRIMARY KEY,
+    embedding_sum vector(1536) NOT NULL,
+    article_count INTEGER NOT NULL DEFAULT 0,
+    embedding vector(1536) NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create the ingest job queue (see jobs.py)
+CREATE TABLE ingest_jobs (
+    id VARCHAR PRIMARY KEY,
+    scholar_id VARCHAR NOT NULL,
+    status VARCHAR NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    progress INTEGER NOT NULL DEFAULT 0,
+    total INTEGER,
+    error TEXT,
+    locked_by VARCHAR,
+    run_after TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    heartbeat_at TIMESTAMP WITH TIME ZONE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE
+);
+CREATE UNIQUE INDEX ingest_jobs_active_scholar_idx ON ingest_jobs(scholar_id) WHERE status IN ('queued', 'running');
+CREATE INDEX ingest_jobs_claim_idx ON ingest_jobs(status, run_after);
+
+-- Create the per-author sync state used for incremental refreshes (see sync.py)
+CREATE TABLE author_sync_state (
+    scholar_id VARCHAR PRIMARY KEY,
+    author_name VARCHAR,
+    citedby INTEGER,
+    publication_count INTEGER NOT NULL DEFAULT 0,
+    publications JSONB NOT NULL DEFAULT '{}',
+    last_synced_at TIMESTAMP WITH TIME ZONE,
+    listed_at TIMESTAMP WITH TIME ZONE,
+    last_changed_at TIMESTAMP WITH TIME ZONE,
+    sync_interval_seconds FLOAT NOT NULL,
+    next_sync_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+-- Create the data version counters used for cache invalidation (see data_version.py)
+CREATE TABLE data_versions (
+    name VARCHAR PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Precomputed k-nearest-neighbour graph over authors (see graph.py)
+CREATE TABLE author_edges (
+    source_id VARCHAR REFERENCES authors(id) ON DELETE CASCADE,
+    target_id VARCHAR REFERENCES authors(id) ON DELETE CASCADE,
+    rank INTEGER NOT NULL,
+    overall FLOAT NOT NULL,
+    profile_similarity FLOAT,
+    work_similarity FLOAT,
+    top_pairs JSONB NOT NULL DEFAULT '[]',
+    computed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (source_id, target_id)
+);
+
+CREATE TABLE author_graph_nodes (
+    author_id VARCHAR PRIMARY KEY REFERENCES authors(id) ON DELETE CASCADE,
+    community INTEGER,
+    degree INTEGER NOT NULL DEFAULT 0,
+    kth_similarity FLOAT NOT NULL,
+    article_count INTEGER NOT NULL DEFAULT 0,
+    computed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Create indexes
 CREATE INDEX ON authors(name);
+CREATE INDEX authors_interest_terms_idx ON authors USING gin (interest_terms);
 CREATE INDEX ON articles(title);
-CREATE INDEX ON articles(author_name); 
\ No newline at end of file
+CREATE INDEX ix_articles_title_key ON articles(title_key);
+CREATE INDEX articles_created_at_id_idx ON articles(created_at, id);
+CREATE INDEX article_authors_author_name_idx ON article_authors(author_name, article_id);
+CREATE INDEX articles_search_vector_idx ON articles USING gin (search_vector);
+CREATE INDEX articles_year_idx ON articles(year);
+CREATE INDEX articles_journal_idx ON articles(journal);
+CREATE INDEX articles_projection_version_idx ON articles(projection_version);
+CREATE INDEX author_edges_source_overall_idx ON author_edges(source_id, overall DESC);
+CREATE INDEX author_edges_target_idx ON author_edges(target_id);
+CREATE INDEX ON author_graph_nodes(community);
+CREATE INDEX ON author_sync_state(next_sync_at);
+
+-- Approximate nearest neighbour indexes for cosine distance (see vector_index.py)
+CREATE INDEX articles_embedding_ann_idx ON articles USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+CREATE INDEX articles_embedding_reduced_ann_idx ON articles USING hnsw (embedding_reduced vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+CREATE INDEX authors_embedding_ann_idx ON authors USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+CREATE INDEX author_centroids_embedding_ann_idx ON author_centroids USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+import asyncio
+import os
+import threading
+from typing import List, Optional, Sequence
+
+import openai
+
+from vector_index import VECTOR_DIMENSION
+
+# 'openai' (hosted API) or 'local' (a sentence-transformers model on disk, run on CPU)
+EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'openai')
+EMBEDDING_MODEL_PATH = os.getenv('EMBEDDING_MODEL_PATH')
+DEFAULT_OPENAI_MODEL = 'text-embedding-ada-002'
+# Model name recorded with every embedding and used to keep models apart;
+# a local model defaults to the name of its directory
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL') or (
+    os.path.basename(os.path.normpath(EMBEDDING_MODEL_PATH))
+    if EMBEDDING_BACKEND == 'local' and EMBEDDING_MODEL_PATH else DEFAULT_OPENAI_MODEL
+)
+# OpenAI: inputs per request (API max 2048) and requests in flight at once
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '256'))
+EMBEDDING_CONCURRENCY = int(os.getenv('EMBEDDING_CONCURRENCY', '4'))
+# Local inference: texts per forward pass, and batches encoded in parallel
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv('LOCAL_EMBEDDING_BATCH_SIZE', '32'))
+LOCAL_EMBEDDING_WORKERS = int(os.getenv('LOCAL_EMBEDDING_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+
+def pad_embedding(embedding: Sequence[float], dimension: int = VECTOR_DIMENSION) -> List[float]:
+    """
+    Zero-pad an embedding to the width of the vector columns
+
+    Padding leaves cosine similarity between vectors of the same model
+    unchanged, so smaller local models share the vector(1536) columns and
+    indexes; the real dimension is stored next to each row.
+    """
+    embedding = list(embedding)
+    if len(embedding) > dimension:
+        raise ValueError(f"Embedding dimension {len(embedding)} exceeds the vector columns' {dimension}")
+    return embedding + [0.0] * (dimension - len(embedding))
+
+
+class EmbeddingBackend:
+    """
+    Turns batches of texts into embeddings
+
+    batch_size and concurrency tell get_embeddings how to split work and how
+    many batches to run at once.
+    """
+
+    model: str
+    dimension: int
+    batch_size: int
+    concurrency: int
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embeddings of the texts, in order, padded to the vector column width"""
+        raise NotImplementedError
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        """Async variant; by default runs embed() in a thread so the event loop isn't blocked"""
+        return await asyncio.to_thread(self.embed, texts)
+
+
+class OpenAIBackend(EmbeddingBackend):
+    """OpenAI's embeddings API; one request per batch"""
+
+    def __init__(
+        self,
+        model: str = EMBEDDING_MODEL,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        concurrency: int = EMBEDDING_CONCURRENCY
+    ):
+        self.model = model
+        self.dimension = VECTOR_DIMENSION
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self._async_client = None
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        response = openai.embeddings.create(model=self.model, input=texts)
+        return self._ordered(response, len(texts))
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        if self._async_client is None:
+            self._async_client = openai.AsyncOpenAI(api_key=openai.api_key)
+        response = await self._async_client.embeddings.create(model=self.model, input=texts)
+        return self._ordered(response, len(texts))
+
+    @staticmethod
+    def _ordered(response, n: int) -> List[List[float]]:
+        # The API doesn't promise to return items in input order
+        embeddings = [None] * n
+        for item in response.data:
+            embeddings[item.index] = pad_embedding(item.embedding)
+        return embeddings
+
+
+class LocalBackend(EmbeddingBackend):
+    """
+    A sentence-transformers model loaded from a local path, run on CPU
+
+    Batches are encoded concurrently by get_embeddings' thread pool; torch
+    releases the GIL during inference, and its intra-op threads are split
+    between the workers so they don't oversubscribe the cores.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        model: str = EMBEDDING_MODEL,
+        batch_size: int = LOCAL_EMBEDDING_BATCH_SIZE,
+        concurrency: int = LOCAL_EMBEDDING_WORKERS
+    ):
+        try:
+            import torch
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError("EMBEDDING_BACKEND=local needs the sentence-transformers package") from e
+
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // max(1, concurrency)))
+        self._model = SentenceTransformer(path, device='cpu')
+        self.model = model
+        self.dimension = self._model.get_sentence_embedding_dimension()
+        if self.dimension > VECTOR_DIMENSION:
+            raise ValueError(f"Model dimension {self.dimension} exceeds the vector columns' {VECTOR_DIMENSION}")
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        vectors = self._model.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+        return [pad_embedding(vector.tolist()) for vector in vectors]
+
+
+_backend: Optional[EmbeddingBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_embedding_backend() -> EmbeddingBackend:
+    """The configured backend, created on first use (a local model loads only once per process)"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if EMBEDDING_BACKEND == 'openai':
+                _backend = OpenAIBackend()
+            elif EMBEDDING_BACKEND == 'local':
+                if not EMBEDDING_MODEL_PATH:
+                    raise ValueError("EMBEDDING_BACKEND=local needs EMBEDDING_MODEL_PATH")
+                _backend = LocalBackend(EMBEDDING_MODEL_PATH)
+            else:
+                raise ValueError(f"Unknown EMBEDDING_BACKEND: {EMBEDDING_BACKEND}")
+        return _backend
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different inputs share a cache entry"""
+    return ' '.join(text.split())
+
+
+def cache_key(model: str, text: str) -> str:
+    """Content address of an embedding: sha256 over (model, normalized text)"""
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache
+
+    A bounded in-process LRU sits in front of an optional SQLite file shared
+    by every process on the host. Entries are evicted from the file by least
+    recent use once it grows past max_disk_items. A forked child opens its
+    own connection, since SQLite connections can't be used across fork().
+    """
+
+    # Check the on-disk size only every this many writes
+    EVICTION_INTERVAL = 100
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_memory_items: int = 10000,
+        max_disk_items: int = 1000000
+    ):
+        self.max_memory_items = max_memory_items
+        self.max_disk_items = max_disk_items
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.path = path
+        self._db = None
+        self._pid = None
+        # Connections inherited through fork(); kept referenced so they are never closed in the child
+        self._inherited: List[sqlite3.Connection] = []
+        if path:
+            self._connect()
+
+    def _connect(self):
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._pid = os.getpid()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings(last_used)")
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """This process's SQLite connection, reopened after a fork (call with the lock held)"""
+        if self._db is not None and self._pid != os.getpid():
+            self._inherited.append(self._db)
+            self._connect()
+        return self._db
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        """Cached embedding for the text, or None on a miss"""
+        key = cache_key(model, text)
+        with self._lock:
+            db = self._connection()
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return vector.tolist()
+
+            if db is not None:
+                row = db.execute(
+                    "SELECT vector FROM embeddings WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    db.execute(
+                        "UPDATE embeddings SET last_used = ? WHERE key = ?", (time.time(), key)
+                    )
+                    vector = np.frombuffer(row[0], dtype=np.float32)
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+                    return vector.tolist()
+
+            self.misses += 1
+            return None
+
+    def put(self, model: str, text: str, embedding: List[float]):
+        """Store an embedding in both tiers"""
+        key = cache_key(model, text)
+        vector = np.asarray(embedding, dtype=np.float32)
+        with self._lock:
+            self._remember(key, vector)
+
+            db = self._connection()
+            if db is not None:
+                db.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, model, vector, last_used) VALUES (?, ?, ?, ?)",
+                    (key, model, vector.tobytes(), time.time())
+                )
+                self._writes += 1
+                if self._writes % self.EVICTION_INTERVAL == 0:
+                    self._evict()
+
+    def _evict(self):
+        count = self._db.execute("SELECT count(*) FROM embeddings").fetchone()[0]
+        excess = count - self.max_disk_items
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+            self.evictions += excess
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current size of each tier"""
+        with self._lock:
+            disk_items = None
+            db = self._connection()
+            if db is not None:
+                disk_items = db.execute("SELECT count(*) FROM embeddings").fetchone()[0]
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'memory_items': len(self._memory),
+                'disk_items': disk_items,
+            }
@@ -23,18 +23,31 @@ class ScholarAPI:
         response.raise_for_status()
         return response.json()
 
-    def get_articles(self, author_name: str = None, limit: int = 10, offset: int = 0) -> List[Dict]:
+    def get_job(self, job_id: str) -> Dict:
         """
-        Retrieve processed articles
+        Get the status and progress of an ingest job
+        
+        Args:
+            job_id: ID returned by process_author
+        """
+        response = requests.get(f"{self.base_url}/jobs/{job_id}")
+        response.raise_for_status()
+        return response.json()
+
+    def get_articles(self, author_name: str = None, limit: int = 10, cursor: str = None) -> Dict:
+        """
+        Retrieve a page of processed articles
         
         Args:
             author_name: Optional name to filter by
             limit: Number of articles to return
-            offset: Number of articles to skip
+            cursor: next_cursor from the previous page
         """
-        params = {"limit": limit, "offset": offset}
+        params = {"limit": limit}
         if author_name:
             params["author_name"] = author_name
+        if cursor:
+            params["cursor"] = cursor
             
         response = requests.get(f"{self.base_url}/articles/", params=params)
         response.raise_for_status()
@@ -69,12 +82,17 @@ def main():
         print(f"Message: {result['message']}")
         
         # Wait a bit for some articles to be processed
-        print("\nWaiting 30 seconds for initial processing...")
-        time.sleep(30)
+        print("\nWaiting up to 30 seconds for initial processing...")
+        for _ in range(6):
+            time.sleep(5)
+            job = api.get_job(result['job_id'])
+            print(f"Job {job['status']}: {job['progress']}/{job['total'] or '?'} publications")
+            if job['status'] in ("succeeded", "failed") or job['progress']:
+                break
         
         # Get the first batch of articles
         print("\nRetrieving processed articles...")
-        articles = api.get_articles(limit=5)
+        articles = api.get_articles(limit=5)['items']
         print(f"\nFound {len(articles)} articles:")
         for article in articles:
             print(f"\nTitle: {article['title']}")
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Iterator, Optional
+
+import numpy as np
+import pyarrow as pa
+from sqlalchemy import select
+
+from db_models import Article
+from embed_articles import SessionLocal
+from search import article_author_names, authored_by
+
+# Rows fetched per server-side cursor round trip and per Arrow record batch
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '2000'))
+EMBEDDING_DIM = 1536
+
+EXPORT_COLUMNS = [
+    Article.id,
+    Article.title,
+    Article.authors,
+    Article.year,
+    Article.journal,
+    Article.citations,
+    Article.abstract,
+    Article.url,
+    article_author_names(),
+    Article.created_at,
+    Article.embedding_model,
+    Article.embedding_dim,
+    Article.embedding
+]
+
+ARROW_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('title', pa.string()),
+    ('authors', pa.string()),
+    ('year', pa.int32()),
+    ('journal', pa.string()),
+    ('citations', pa.int32()),
+    ('abstract', pa.string()),
+    ('url', pa.string()),
+    ('author_names', pa.list_(pa.string())),
+    ('created_at', pa.timestamp('us', tz='UTC')),
+    ('embedding_model', pa.string()),
+    ('embedding_dim', pa.int32()),
+    ('embedding', pa.list_(pa.float32(), EMBEDDING_DIM)),
+])
+
+
+def iter_article_batches(
+    author_name: Optional[str] = None,
+    since: Optional[datetime] = None,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[list]:
+    """
+    Stream embedded articles in (created_at, id) order through a server-side
+    cursor, one list of rows per batch, so memory stays constant
+    """
+    query = select(*EXPORT_COLUMNS).where(Article.embedding.isnot(None))
+    if author_name:
+        query = query.where(authored_by(author_name))
+    if since:
+        query = query.where(Article.created_at >= since)
+    query = query.order_by(Article.created_at, Article.id)
+
+    db = SessionLocal()
+    try:
+        result = db.execute(query.execution_options(yield_per=batch_size))
+        for partition in result.partitions():
+            yield partition
+    finally:
+        db.close()
+
+
+def ndjson_chunks(**filters) -> Iterator[bytes]:
+    """One JSON object per line, one chunk per batch"""
+    for rows in iter_article_batches(**filters):
+        lines = []
+        for row in rows:
+            record = row._asdict()
+            record['created_at'] = row.created_at.isoformat() if row.created_at else None
+            record['embedding'] = np.asarray(row.embedding, dtype=np.float32).tolist()
+            lines.append(json.dumps(record, ensure_ascii=False))
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def _record_batch(rows: list) -> pa.RecordBatch:
+    columns = {name: [getattr(row, name) for row in rows] for name in ARROW_SCHEMA.names if name != 'embedding'}
+    embeddings = np.asarray([row.embedding for row in rows], dtype=np.float32).reshape(-1)
+    columns['embedding'] = pa.FixedSizeListArray.from_arrays(pa.array(embeddings, pa.float32()), EMBEDDING_DIM)
+    return pa.RecordBatch.from_pydict(columns, schema=ARROW_SCHEMA)
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back to a generator"""
+
+    closed = False
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def arrow_chunks(**filters) -> Iterator[bytes]:
+    """Arrow IPC stream: the schema first, then one record batch per chunk"""
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(sink, ARROW_SCHEMA)
+    yield sink.drain()
+
+    for rows in iter_article_batches(**filters):
+        writer.write_batch(_record_batch(rows))
+        yield sink.drain()
+
+    writer.close()
+    yield sink.drain()
+
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', ndjson_chunks),
+    'arrow': ('application/vnd.apache.arrow.stream', arrow_chunks),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export articles with embeddings")
+    parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='ndjson')
+    parser.add_argument('--author', help="Only export articles of this author")
+    parser.add_argument('--since', type=datetime.fromisoformat, help="Only export articles created at or after this ISO timestamp")
+    parser.add_argument('-o', '--output', help="Output file (default: stdout)")
+    args = parser.parse_args()
+
+    _, chunks = EXPORT_FORMATS[args.format]
+    out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks(author_name=args.author, since=args.since):
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
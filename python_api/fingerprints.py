@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+
+import re
+import unicodedata
+from typing import Dict, Optional
+from urllib.parse import unquote
+
+_DOI = re.compile(r'\b(10\.\d{4,9}/[^\s?#"&]+)', re.IGNORECASE)
+
+
+def normalize_title(title: str) -> str:
+    """Lowercase ASCII words only, so case, accents and punctuation variants of a title agree"""
+    title = unicodedata.normalize('NFKD', title).encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', title.lower()).split())
+
+
+def title_key(title: str, year=None) -> str:
+    """Normalized title plus year; known before a publication is filled"""
+    return f"{normalize_title(title)}|{year or ''}"
+
+
+def extract_doi(*texts: Optional[str]) -> Optional[str]:
+    """First DOI found in the given strings (URLs such as doi.org/10.1145/...), lowercased"""
+    for text in texts:
+        if text:
+            match = _DOI.search(unquote(text))
+            if match:
+                return match.group(1).rstrip('.').lower()
+    return None
+
+
+def has_doi(fingerprint: str) -> bool:
+    return fingerprint.startswith('doi:')
+
+
+def article_fingerprint(article: Dict) -> str:
+    """
+    Content address of a paper: its DOI when one is known, else its title key
+
+    Copies of a paper scraped from different co-authors' profiles share a
+    fingerprint, so they are stored and embedded once.
+    """
+    doi = extract_doi(article.get('doi'), article.get('url'))
+    if doi:
+        return f"doi:{doi}"
+    return f"title:{title_key(article['title'], article.get('year'))}"
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from collections import Counter, defaultdict
+from multiprocessing import Pool
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from data_version import GRAPH, bump_data_version
+from db_models import Article, ArticleAuthor, AuthorCentroid, AuthorEdge, AuthorGraphNode
+from embed_articles import SessionLocal, engine as db_engine, setup_database
+from embedding_backends import EMBEDDING_MODEL
+from matching import MatchingEngine, normalize_rows
+from snapshot import load_snapshot, write_snapshot
+
+# Neighbours kept per author, and the lowest score worth an edge
+GRAPH_K = int(os.getenv('GRAPH_K', '20'))
+GRAPH_MIN_SIMILARITY = float(os.getenv('GRAPH_MIN_SIMILARITY', '0.5'))
+# Authors scored per matrix product / per worker task
+GRAPH_BLOCK_SIZE = int(os.getenv('GRAPH_BLOCK_SIZE', '256'))
+GRAPH_WORKERS = int(os.getenv('GRAPH_WORKERS', str(os.cpu_count() or 1)))
+# Most similar paper pairs stored with every edge
+GRAPH_TOP_PAIRS = int(os.getenv('GRAPH_TOP_PAIRS', '3'))
+GRAPH_LABEL_ITERATIONS = int(os.getenv('GRAPH_LABEL_ITERATIONS', '20'))
+
+# Engine of the current worker process, mapped from the refresh's snapshot
+_engine: Optional[MatchingEngine] = None
+
+
+def _init_worker(snapshot_path: str):
+    global _engine
+    # Don't reuse connections inherited from the parent process
+    db_engine.dispose(close=False)
+    _engine = load_snapshot(snapshot_path)
+
+
+def _article_vectors(db, author_names: Iterable[str]) -> Dict[str, Tuple[list, np.ndarray]]:
+    """Per author: ([(title, year)], normalized embedding matrix)"""
+    papers: Dict[str, list] = defaultdict(list)
+    vectors: Dict[str, list] = defaultdict(list)
+    for article in db.execute(
+        select(ArticleAuthor.author_name, Article.title, Article.year, Article.embedding).join(
+            Article, Article.id == ArticleAuthor.article_id
+        ).where(
+            ArticleAuthor.author_name.in_(list(author_names)),
+            Article.embedding.isnot(None),
+            Article.embedding_model == EMBEDDING_MODEL
+        )
+    ):
+        papers[article.author_name].append((article.title, article.year))
+        vectors[article.author_name].append(article.embedding)
+    return {
+        name: (papers[name], normalize_rows(np.array(vectors[name], dtype=np.float32)))
+        for name in papers
+    }
+
+
+def top_paper_pairs(source: Tuple[list, np.ndarray], target: Tuple[list, np.ndarray], n: int = GRAPH_TOP_PAIRS) -> List[Dict]:
+    """The n most similar (source paper, target paper) pairs of two authors"""
+    source_papers, source_matrix = source
+    target_papers, target_matrix = target
+    scores = (source_matrix @ target_matrix.T).ravel()
+    n = min(n, len(scores))
+    top = np.argpartition(-scores, n - 1)[:n]
+    top = top[np.argsort(-scores[top], kind='stable')]
+    pairs = []
+    for flat in top:
+        i, j = divmod(int(flat), len(target_papers))
+        pairs.append({
+            'source_title': source_papers[i][0],
+            'target_title': target_papers[j][0],
+            'target_year': target_papers[j][1],
+            'score': round(float(scores[flat]), 4),
+        })
+    return pairs
+
+
+def compute_block(rows: List[int]) -> List[Tuple[str, int, float]]:
+    """
+    Recompute and store the edges of a block of authors (runs in a worker)
+
+    Returns:
+        (author_id, degree, kth_similarity) for every author of the block
+    """
+    engine = _engine
+    ranked = engine.rank_many(rows, GRAPH_MIN_SIMILARITY, GRAPH_K)
+
+    names = {engine.names[row] for row in rows}
+    names.update(engine.names[candidate] for matches in ranked for candidate, _, _, _ in matches)
+
+    db = SessionLocal()
+    try:
+        articles = _article_vectors(db, names)
+
+        edges = []
+        nodes = []
+        for row, matches in zip(rows, ranked):
+            source = articles.get(engine.names[row])
+            for rank, (candidate, overall, profile, work) in enumerate(matches):
+                target = articles.get(engine.names[candidate])
+                edges.append({
+                    'source_id': engine.author_ids[row],
+                    'target_id': engine.author_ids[candidate],
+                    'rank': rank,
+                    'overall': overall,
+                    'profile_similarity': profile,
+                    'work_similarity': work,
+                    'top_pairs': top_paper_pairs(source, target) if source and target else [],
+                })
+            kth = matches[-1][1] if len(matches) == GRAPH_K else GRAPH_MIN_SIMILARITY
+            nodes.append((engine.author_ids[row], len(matches), kth))
+
+        db.query(AuthorEdge).filter(
+            AuthorEdge.source_id.in_([engine.author_ids[row] for row in rows])
+        ).delete(synchronize_session=False)
+        if edges:
+            db.execute(insert(AuthorEdge), edges)
+        db.commit()
+        return nodes
+    finally:
+        db.close()
+
+
+def rows_to_refresh(db, engine: MatchingEngine, article_counts: Dict[str, int]) -> Set[int]:
+    """
+    Authors whose stored edges may be out of date
+
+    That is every author without a node or whose article count changed, every
+    author with an edge to one of those, and every author that one of those
+    now scores above its current k-th neighbour (similarity is symmetric).
+    """
+    nodes = {
+        node.author_id: node for node in db.query(
+            AuthorGraphNode.author_id, AuthorGraphNode.article_count, AuthorGraphNode.kth_similarity
+        )
+    }
+    changed = [
+        row for row, author_id in enumerate(engine.author_ids)
+        if author_id not in nodes
+        or nodes[author_id].article_count != article_counts.get(engine.names[row], 0)
+    ]
+    if not changed or len(changed) == len(engine):
+        return set(changed)
+
+    affected = set(changed)
+    changed_ids = [engine.author_ids[row] for row in changed]
+    for start in range(0, len(changed_ids), 5000):
+        affected.update(
+            engine.index[source_id] for source_id, in db.query(AuthorEdge.source_id).filter(
+                AuthorEdge.target_id.in_(changed_ids[start:start + 5000])
+            ).distinct()
+            if source_id in engine.index
+        )
+
+    kth = np.array([
+        nodes[author_id].kth_similarity if author_id in nodes else np.inf
+        for author_id in engine.author_ids
+    ], dtype=np.float32)
+    for start in range(0, len(changed), GRAPH_BLOCK_SIZE):
+        similarities = engine.similarities(changed[start:start + GRAPH_BLOCK_SIZE])
+        affected.update(np.flatnonzero((similarities >= kth).any(axis=0)).tolist())
+    return affected
+
+
+def detect_communities(edges: List[Tuple[str, str, float]], author_ids: List[str]) -> Dict[str, int]:
+    """
+    Weighted label propagation over the undirected kNN graph
+
+    Communities are numbered by size, largest first; authors without edges
+    end up alone in their own community.
+    """
+    neighbours: Dict[str, Dict[str, float]] = {author_id: {} for author_id in author_ids}
+    for source, target, weight in edges:
+        if source in neighbours and target in neighbours:
+            neighbours[source][target] = max(weight, neighbours[source].get(target, 0.0))
+            neighbours[target][source] = max(weight, neighbours[target].get(source, 0.0))
+
+    labels = {author_id: i for i, author_id in enumerate(sorted(author_ids))}
+    order = sorted(author_ids)
+    rng = random.Random(0)
+    for _ in range(GRAPH_LABEL_ITERATIONS):
+        rng.shuffle(order)
+        moved = 0
+        for author_id in order:
+            weights: Dict[int, float] = defaultdict(float)
+            for neighbour, weight in neighbours[author_id].items():
+                weights[labels[neighbour]] += weight
+            if not weights:
+                continue
+            best = max(weights.items(), key=lambda item: (item[1], -item[0]))[0]
+            if best != labels[author_id]:
+                labels[author_id] = best
+                moved += 1
+        if not moved:
+            break
+
+    sizes = Counter(labels.values())
+    numbering = {label: i for i, (label, _) in enumerate(sorted(sizes.items(), key=lambda item: (-item[1], item[0])))}
+    return {author_id: numbering[label] for author_id, label in labels.items()}
+
+
+def refresh_graph(full: bool = False, workers: int = GRAPH_WORKERS) -> Dict[str, int]:
+    """
+    Bring the author similarity graph up to date
+
+    Only stale authors are recomputed unless full is set. Blocks of authors
+    are scored in parallel worker processes that all map one snapshot of the
+    matching matrices; communities are then recomputed over the whole graph.
+    """
+    started = time.monotonic()
+    db = SessionLocal()
+    try:
+        article_counts = dict(db.query(AuthorCentroid.author_name, AuthorCentroid.article_count))
+        engine = MatchingEngine.from_database(db)
+        rows = set(range(len(engine))) if full else rows_to_refresh(db, engine, article_counts)
+        rows = sorted(rows)
+        blocks = [rows[start:start + GRAPH_BLOCK_SIZE] for start in range(0, len(rows), GRAPH_BLOCK_SIZE)]
+
+        nodes = []
+        if blocks and workers <= 1:
+            global _engine
+            _engine = engine
+            for block in blocks:
+                nodes.extend(compute_block(block))
+        elif blocks:
+            # Workers share the matrices through one mapped file instead of a copy each
+            with tempfile.TemporaryDirectory() as directory:
+                snapshot_path = os.path.join(directory, 'graph.snap')
+                write_snapshot(engine, snapshot_path, version=0)
+                with Pool(workers, initializer=_init_worker, initargs=(snapshot_path,)) as pool:
+                    for block_nodes in pool.imap_unordered(compute_block, blocks):
+                        nodes.extend(block_nodes)
+
+        names = dict(zip(engine.author_ids, engine.names))
+        if nodes:
+            node_rows = [
+                {
+                    'author_id': author_id,
+                    'degree': degree,
+                    'kth_similarity': kth,
+                    'article_count': article_counts.get(names[author_id], 0),
+                }
+                for author_id, degree, kth in nodes
+            ]
+            for start in range(0, len(node_rows), 1000):
+                statement = insert(AuthorGraphNode).values(node_rows[start:start + 1000])
+                db.execute(statement.on_conflict_do_update(
+                    index_elements=['author_id'],
+                    set_={
+                        'degree': statement.excluded.degree,
+                        'kth_similarity': statement.excluded.kth_similarity,
+                        'article_count': statement.excluded.article_count,
+                        'computed_at': statement.excluded.computed_at,
+                    }
+                ))
+
+            communities = detect_communities(
+                db.query(AuthorEdge.source_id, AuthorEdge.target_id, AuthorEdge.overall).all(),
+                [author_id for author_id, in db.query(AuthorGraphNode.author_id)]
+            )
+            db.execute(update(AuthorGraphNode), [
+                {'author_id': author_id, 'community': community}
+                for author_id, community in communities.items()
+            ])
+            bump_data_version(db, GRAPH)
+        db.commit()
+
+        return {
+            'authors': len(engine),
+            'refreshed': len(nodes),
+            'seconds': round(time.monotonic() - started, 2),
+        }
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh the precomputed author similarity graph")
+    parser.add_argument('--full', action='store_true', help="Recompute every author, not only stale ones")
+    parser.add_argument('--workers', type=int, default=GRAPH_WORKERS, help="Number of worker processes")
+    args = parser.parse_args()
+
+    setup_database()
+    print(f"Graph refreshed: {refresh_graph(full=args.full, workers=args.workers)}")
+
+
+if __name__ == "__main__":
+    main()
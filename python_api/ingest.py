@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+
+import time
+from typing import Callable, Dict, Optional
+
+import scholarly
+from sqlalchemy import or_
+from sqlalchemy.dialects.postgresql import insert
+
+from embed_articles import SessionLocal
+from bulk_load import find_articles, link_articles, linked_keys, update_article_citations
+from data_version import bump_data_version
+from db_models import Author
+from interests import normalize_interests
+from matching import invalidate_matching_engine
+from metrics import count_articles, stage_timer
+from pipeline import IngestPipeline
+from rate_limit import scholar_rate_limiter
+from sync import diff_publications, get_sync_state, needs_listing, publication_key, record_sync, stored_publications
+
+
+def upsert_author(db, author: Dict) -> bool:
+    """
+    Insert or update the authors row from a filled Scholar profile
+
+    The corpus version is only bumped (in the caller's transaction) when a
+    field actually changed, so unchanged profiles don't invalidate caches.
+
+    Returns:
+        bool: Whether the row was inserted or changed
+    """
+    values = {
+        'id': author['scholar_id'],
+        'name': author['name'],
+        'interests': author.get('interests') or [],
+        'interest_terms': normalize_interests(author.get('interests')),
+        'citations': author.get('citedby') or 0,
+        'h_index': author.get('hindex') or 0,
+        'i10_index': author.get('i10index') or 0,
+    }
+    statement = insert(Author).values(**values)
+    changed = db.execute(statement.on_conflict_do_update(
+        index_elements=['id'],
+        set_={key: statement.excluded[key] for key in values if key != 'id'},
+        where=or_(*(
+            getattr(Author, key).is_distinct_from(statement.excluded[key])
+            for key in values if key != 'id'
+        ))
+    ).returning(Author.id)).first() is not None
+    if changed:
+        bump_data_version(db)
+    return changed
+
+
+def process_author_publications(
+    author_id: str,
+    on_total: Optional[Callable[[int], None]] = None,
+    on_progress: Optional[Callable[[int], None]] = None,
+    full: bool = False
+) -> Dict[str, int]:
+    """
+    Bring a Google Scholar author up to date, fetching only what changed
+
+    The profile page is fetched first; if its citation total matches the last
+    sync (see sync.needs_listing) nothing else is requested. Otherwise the
+    publication list is diffed against the last sync: new publications a
+    co-author's profile already brought in are just linked, only the rest
+    are filled, embedded and stored, and changed citation counts are updated
+    in place. Already stored publications are skipped, so re-running after a
+    failure resumes where the previous run stopped.
+
+    Args:
+        author_id (str): Google Scholar user id
+        on_total: Called once with the number of new publications
+        on_progress: Called with the number of publications written by each batch
+        full: Walk the whole publication list even if the profile looks unchanged
+
+    Returns:
+        Dict[str, int]: Pipeline statistics
+    """
+    started = time.monotonic()
+
+    # Search for author by ID; this fills the basics, including the citation total
+    scholar_rate_limiter.acquire()
+    with stage_timer('scholarly_fetch'):
+        author = scholarly.search_author_id(author_id)
+    if not author:
+        raise ValueError(f"Author not found with ID: {author_id}")
+
+    db = SessionLocal()
+    try:
+        state = get_sync_state(db, author['scholar_id'])
+        if not full and not needs_listing(state, author.get('citedby')):
+            record_sync(db, author['scholar_id'], author['name'], author.get('citedby'), changed=False)
+            if on_total:
+                on_total(0)
+            stats = {'publications': 0, 'written': 0, 'linked': 0, 'citations_updated': 0, 'unchanged': 1,
+                     'seconds': round(time.monotonic() - started, 2)}
+            print(f"Author {author['name']} unchanged since last sync")
+            return stats
+    finally:
+        db.close()
+
+    # Fill the profile and publication list only (no coauthor pages)
+    scholar_rate_limiter.acquire()
+    with stage_timer('scholarly_fetch'):
+        author = scholarly.fill(author, sections=['indices', 'publications'])
+    publications = author['publications']
+    keys = [publication_key(pub) for pub in publications]
+
+    # Diff against the last sync and the articles linked to the author
+    db = SessionLocal()
+    try:
+        profile_changed = upsert_author(db, author)
+        existing = linked_keys(db, author['name'], keys)
+        new_pubs, citations = diff_publications(None if full else state, publications, existing)
+        update_article_citations(db, author['name'], citations)
+
+        # Papers stored from a co-author's profile need no fetching or embedding (only
+        # DOI-less ones match by title; the rest are recognized by DOI once filled)
+        stored = find_articles(db, title_keys=[publication_key(pub) for pub in new_pubs])
+        linked = link_articles(db, author['name'], [
+            stored[publication_key(pub)] for pub in new_pubs if publication_key(pub) in stored
+        ])
+        new_pubs = [pub for pub in new_pubs if publication_key(pub) not in stored]
+        db.commit()
+    finally:
+        db.close()
+
+    count_articles('deduplicated', linked)
+    count_articles('skipped', len(publications) - len(new_pubs) - linked)
+    if on_total:
+        on_total(len(new_pubs))
+
+    # Fetch, embed and write concurrently; stages are rate limited and batched
+    pipeline = IngestPipeline(author['name'], on_written=on_progress)
+    stats = pipeline.run(new_pubs)
+    stats['linked'] = linked
+    stats['citations_updated'] = len(citations)
+    print(f"Processed author {author['name']}: {stats}")
+
+    if stats['written'] or linked or profile_changed:
+        invalidate_matching_engine()
+
+    # Publications that failed stay out of the state and are retried next sync
+    db = SessionLocal()
+    try:
+        stored = linked_keys(db, author['name'], keys)
+        record_sync(
+            db,
+            author['scholar_id'],
+            author['name'],
+            author.get('citedby'),
+            changed=bool(stats['written'] or linked or citations or profile_changed),
+            publications=stored_publications(publications, stored),
+            publication_count=sum(1 for key in keys if key is not None)
+        )
+    finally:
+        db.close()
+
+    if pipeline.errors:
+        raise RuntimeError(f"{len(pipeline.errors)} pipeline steps failed: {pipeline.errors[0]}")
+    return stats
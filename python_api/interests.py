@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List
+
+from sqlalchemy import bindparam, select
+
+from data_version import bump_data_version
+from db_models import Author
+
+# Optional JSON object mapping interest variants to their canonical term, on top of the built-in ones
+INTEREST_SYNONYMS_PATH = os.getenv('INTEREST_SYNONYMS_PATH')
+
+# Common abbreviations on Scholar profiles; keys and values are already normalized
+_BUILTIN_SYNONYMS = {
+    'ai': 'artificial intelligence',
+    'ml': 'machine learning',
+    'dl': 'deep learning',
+    'nlp': 'natural language processing',
+    'cv': 'computer vision',
+    'hci': 'human computer interaction',
+    'rl': 'reinforcement learning',
+    'ir': 'information retrieval',
+    'hpc': 'high performance computing',
+    'iot': 'internet of things',
+}
+
+_SEPARATORS = re.compile(r'[\s\-_/,;]+')
+
+
+def _normalized_text(term: str) -> str:
+    return _SEPARATORS.sub(' ', term.lower()).strip()
+
+
+@lru_cache(maxsize=1)
+def synonyms() -> Dict[str, str]:
+    """Variant -> canonical term, built-in abbreviations plus INTEREST_SYNONYMS_PATH"""
+    mapping = dict(_BUILTIN_SYNONYMS)
+    if INTEREST_SYNONYMS_PATH:
+        with open(INTEREST_SYNONYMS_PATH, 'r', encoding='utf-8') as f:
+            mapping.update({
+                _normalized_text(variant): _normalized_text(canonical)
+                for variant, canonical in json.load(f).items()
+            })
+    return mapping
+
+
+def normalize_interest(term: str) -> str:
+    """Canonical form of an interest: lowercase, separators folded to spaces, synonyms resolved"""
+    term = _normalized_text(term)
+    return synonyms().get(term, term)
+
+
+def normalize_interests(interests: Iterable[str]) -> List[str]:
+    """Distinct canonical terms of an interest list, in their original order"""
+    terms = []
+    for interest in interests or []:
+        term = normalize_interest(interest)
+        if term and term not in terms:
+            terms.append(term)
+    return terms
+
+
+def reindex_interests(db, batch_size: int = 1000) -> int:
+    """
+    Recompute authors.interest_terms, e.g. after the synonyms changed
+
+    Authors whose terms changed are marked stale, so refresh_profiles
+    rebuilds their profile vectors from the new terms.
+
+    Returns:
+        int: Number of authors whose terms changed
+    """
+    table = Author.__table__
+    changed = 0
+    last_id = ''
+    while True:
+        authors = db.execute(
+            select(Author.id, Author.interests, Author.interest_terms).where(
+                Author.id > last_id
+            ).order_by(Author.id).limit(batch_size)
+        ).all()
+        if not authors:
+            break
+        last_id = authors[-1].id
+        rows = [
+            {'b_id': author.id, 'b_interest_terms': terms}
+            for author in authors
+            for terms in [normalize_interests(author.interests)]
+            if terms != list(author.interest_terms or [])
+        ]
+        if rows:
+            db.execute(
+                table.update().where(table.c.id == bindparam('b_id')).values(
+                    interest_terms=bindparam('b_interest_terms', type_=table.c.interest_terms.type),
+                    embedding_updated_at=None
+                ),
+                rows
+            )
+            changed += len(rows)
+            bump_data_version(db)
+        db.commit()
+    return changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain normalized author interests")
+    parser.add_argument('--reindex', action='store_true', help="Recompute every author's normalized interests")
+    args = parser.parse_args()
+
+    if not args.reindex:
+        parser.print_help()
+        return
+
+    from embed_articles import setup_database, SessionLocal
+
+    setup_database()
+    db = SessionLocal()
+    try:
+        print(f"Updated normalized interests of {reindex_interests(db)} authors")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import socket
+import time
+import uuid
+from datetime import timedelta
+from multiprocessing import Process
+from typing import Optional, Tuple
+
+from sqlalchemy import text, func
+from sqlalchemy.dialects.postgresql import insert
+
+from db_models import IngestJob
+from embed_articles import SessionLocal, engine, setup_database
+from ingest import process_author_publications
+from metrics import export_metrics
+from profiles import refresh_profiles
+from projection import backfill_projection
+from sync import defer_sync, due_scholars
+
+# Worker configuration
+INGEST_WORKERS = int(os.getenv('INGEST_WORKERS', '1'))
+JOB_POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', '5'))
+JOB_RETRY_BASE_SECONDS = float(os.getenv('JOB_RETRY_BASE_SECONDS', '60'))
+# Running jobs without a heartbeat for this long are assumed dead and requeued
+JOB_STALE_SECONDS = float(os.getenv('JOB_STALE_SECONDS', '900'))
+# Scheduler: how often it looks for authors due a sync, and how many jobs it
+# lets wait in the queue, so refreshes trickle in behind submitted scholars
+SYNC_POLL_SECONDS = float(os.getenv('SYNC_POLL_SECONDS', '60'))
+SYNC_MAX_QUEUED = int(os.getenv('SYNC_MAX_QUEUED', '2'))
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+def enqueue_job(db, scholar_id: str, attempts: int = 3) -> Tuple[IngestJob, bool]:
+    """
+    Queue an ingest job for a scholar, or return the one already queued/running
+
+    The partial unique index on active jobs makes this safe against
+    concurrent submissions of the same scholar. If the conflicting job
+    finishes before it can be looked up, the insert is simply retried.
+
+    Returns:
+        Tuple[IngestJob, bool]: The active job and whether it was just created
+    """
+    for _ in range(attempts):
+        job_id = db.execute(
+            insert(IngestJob).values(
+                id=str(uuid.uuid4()),
+                scholar_id=scholar_id,
+                status='queued'
+            ).on_conflict_do_nothing(
+                index_elements=['scholar_id'],
+                index_where=IngestJob.status.in_(ACTIVE_STATUSES)
+            ).returning(IngestJob.id)
+        ).scalar()
+        db.commit()
+        if job_id is not None:
+            return db.get(IngestJob, job_id), True
+
+        job = db.query(IngestJob).filter(
+            IngestJob.scholar_id == scholar_id,
+            IngestJob.status.in_(ACTIVE_STATUSES)
+        ).first()
+        if job is not None:
+            return job, False
+    raise RuntimeError(f"Could not queue a job for {scholar_id}: active jobs kept finishing concurrently")
+
+
+def claim_job(db, worker_id: str) -> Optional[IngestJob]:
+    """
+    Atomically take the next due job; concurrent workers skip locked rows
+
+    The job is loaded in the claiming transaction and returned detached, so
+    the session holds no transaction open while the job runs.
+    """
+    job_id = db.execute(text(
+        "UPDATE ingest_jobs SET status = 'running', attempts = attempts + 1, "
+        "locked_by = :worker, started_at = now(), heartbeat_at = now(), error = NULL "
+        "WHERE id = ("
+        "  SELECT id FROM ingest_jobs "
+        "  WHERE status = 'queued' AND run_after <= now() "
+        "  ORDER BY run_after, created_at "
+        "  FOR UPDATE SKIP LOCKED LIMIT 1"
+        ") RETURNING id"
+    ), {'worker': worker_id}).scalar()
+    job = db.get(IngestJob, job_id) if job_id else None
+    if job is not None:
+        db.expunge(job)
+    db.commit()
+    return job
+
+
+def requeue_stale_jobs(db) -> int:
+    """Return jobs whose worker stopped heartbeating to the queue"""
+    result = db.execute(text(
+        "UPDATE ingest_jobs SET status = 'queued', locked_by = NULL "
+        "WHERE status = 'running' AND heartbeat_at < now() - make_interval(secs => :stale)"
+    ), {'stale': JOB_STALE_SECONDS})
+    db.commit()
+    return result.rowcount
+
+
+def record_progress(db, job_id: str, written: int):
+    """Checkpoint written publications and heartbeat the job"""
+    db.query(IngestJob).filter(IngestJob.id == job_id).update({
+        IngestJob.progress: IngestJob.progress + written,
+        IngestJob.heartbeat_at: func.now()
+    }, synchronize_session=False)
+    db.commit()
+
+
+def record_total(db, job_id: str, total: int):
+    """Record how many publications this attempt has to process"""
+    db.query(IngestJob).filter(IngestJob.id == job_id).update({
+        IngestJob.total: total,
+        IngestJob.progress: 0,
+        IngestJob.heartbeat_at: func.now()
+    }, synchronize_session=False)
+    db.commit()
+
+
+def finish_job(db, job: IngestJob, error: Optional[str] = None):
+    """Mark a job succeeded, or requeue it with exponential backoff until it runs out of attempts"""
+    # Only the columns set here are written, not the progress recorded meanwhile
+    db.add(job)
+    job.locked_by = None
+    if error is None:
+        job.status = 'succeeded'
+        job.finished_at = func.now()
+    elif job.attempts < job.max_attempts:
+        delay = JOB_RETRY_BASE_SECONDS * 2 ** (job.attempts - 1)
+        job.status = 'queued'
+        job.error = error
+        job.run_after = func.now() + timedelta(seconds=delay)
+    else:
+        job.status = 'failed'
+        job.error = error
+        job.finished_at = func.now()
+    db.commit()
+
+
+def run_job(db, job: IngestJob):
+    """Run one claimed job to completion"""
+    # Progress is reported from the pipeline's writer thread, so it gets its own session
+    progress_db = SessionLocal()
+    try:
+        process_author_publications(
+            job.scholar_id,
+            on_total=lambda total: record_total(progress_db, job.id, total),
+            on_progress=lambda written: record_progress(progress_db, job.id, written)
+        )
+    except Exception as e:
+        print(f"Error processing job {job.id}: {str(e)}")
+        finish_job(db, job, error=str(e))
+    else:
+        finish_job(db, job)
+    finally:
+        progress_db.close()
+
+
+def worker_loop(poll_seconds: float = JOB_POLL_SECONDS, once: bool = False):
+    """Claim and run jobs until interrupted"""
+    # Don't reuse connections inherited from the parent process
+    engine.dispose(close=False)
+
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    db = SessionLocal()
+    try:
+        while True:
+            requeue_stale_jobs(db)
+            job = claim_job(db, worker_id)
+            if job is None:
+                if once:
+                    return
+                time.sleep(poll_seconds)
+                continue
+            print(f"Worker {worker_id} running job {job.id} for {job.scholar_id}")
+            run_job(db, job)
+            export_metrics()
+    finally:
+        db.close()
+
+
+def schedule_syncs(db, max_queued: int = SYNC_MAX_QUEUED) -> int:
+    """
+    Queue sync jobs for the authors most due one, keeping at most max_queued
+    jobs waiting (submitted scholars count too, so they are never starved)
+
+    Returns:
+        int: Number of jobs queued
+    """
+    waiting = db.query(func.count(IngestJob.id)).filter(IngestJob.status == 'queued').scalar()
+    scheduled = 0
+    for scholar_id in due_scholars(db, max(0, max_queued - waiting)):
+        defer_sync(db, scholar_id)
+        # enqueue_job commits the deferral together with the job
+        _, created = enqueue_job(db, scholar_id)
+        scheduled += created
+    return scheduled
+
+
+def scheduler_loop(poll_seconds: float = SYNC_POLL_SECONDS, once: bool = False):
+    """
+    Keep the queue topped up with due author syncs, and author profile and
+    projected vectors up to date, until interrupted
+    """
+    engine.dispose(close=False)
+
+    db = SessionLocal()
+    try:
+        while True:
+            scheduled = schedule_syncs(db)
+            if scheduled:
+                print(f"Scheduled {scheduled} author syncs")
+            # Cheap when nothing changed; new interests are the only embedding calls
+            refreshed = refresh_profiles(db)
+            if refreshed:
+                print(f"Rebuilt {refreshed} author profiles")
+            # Articles stored without the current projection, e.g. during a retrain
+            projected = backfill_projection(db)
+            if projected:
+                print(f"Projected {projected} articles for first-pass search")
+            # Every step commits its writes; end the read-only transaction a pass with
+            # nothing to do leaves open, so its locks don't block migrations while idle
+            db.rollback()
+            if once:
+                return
+            time.sleep(poll_seconds)
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run ingest job workers")
+    parser.add_argument('--workers', type=int, default=INGEST_WORKERS, help="Number of worker processes")
+    parser.add_argument('--once', action='store_true', help="Exit when the queue is empty")
+    parser.add_argument('--schedule', action='store_true',
+                        help="Also run the scheduler that re-syncs stale authors in the background")
+    args = parser.parse_args()
+
+    setup_database()
+
+    # With --once, queue the due syncs up front so the workers drain them and exit
+    if args.schedule and args.once:
+        scheduler_loop(once=True)
+
+    if args.workers == 1 and (args.once or not args.schedule):
+        worker_loop(once=args.once)
+        return
+
+    processes = [
+        Process(target=worker_loop, kwargs={'once': args.once})
+        for _ in range(args.workers)
+    ]
+    if args.schedule and not args.once:
+        processes.append(Process(target=scheduler_loop))
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+MATCH_CACHE_SIZE = int(os.getenv('MATCH_CACHE_SIZE', '10000'))
+MATCH_CACHE_TTL = float(os.getenv('MATCH_CACHE_TTL', '3600'))
+
+
+class MatchCache:
+    """
+    Bounded LRU of computed match results with a TTL
+
+    Every entry remembers the data version it was computed at; a lookup with
+    a newer version is a miss, so ingest invalidates all entries at once
+    without having to enumerate them.
+    """
+
+    def __init__(self, max_items: int = MATCH_CACHE_SIZE, ttl: float = MATCH_CACHE_TTL):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, version: int) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            entry_version, expires_at, value = entry
+            if entry_version != version or time.monotonic() > expires_at:
+                del self._entries[key]
+                self.stale += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, version: int, value: Any):
+        with self._lock:
+            self._entries[key] = (version, time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+                'evictions': self.evictions,
+                'items': len(self._entries),
+                'max_items': self.max_items,
+            }
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+
+import os
+import time
+import threading
+from typing import List, Optional, Tuple, Dict
+
+import numpy as np
+
+from db_models import Author, AuthorCentroid
+from quantization import CompactMatrix
+
+# Rebuild the in-memory matrices at most this often (seconds)
+MATCHING_ENGINE_TTL = float(os.getenv('MATCHING_ENGINE_TTL', '300'))
+# Storage precision of the in-memory matrices: float32, float16 or int8
+MATCHING_PRECISION = os.getenv('MATCHING_PRECISION', 'float32')
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize every row in place, leaving all-zero rows untouched"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+class MatchingEngine:
+    """
+    In-memory scorer holding one contiguous matrix of author profile vectors
+    and one of work centroids (mean article embedding), both L2-normalized
+    so a single matrix-vector product yields cosine similarities for every
+    candidate at once.
+
+    With a reduced precision the matrices take half (float16) or a quarter
+    (int8) of the memory; scores then carry a small quantization error.
+
+    With a projection (see projection.py), rank first scores everyone on
+    projected copies of the matrices and only reranks the best
+    limit * rerank_factor candidates on the full vectors.
+    """
+
+    def __init__(
+        self,
+        author_ids: List[str],
+        names: List[str],
+        profile_matrix: np.ndarray,
+        work_matrix: np.ndarray,
+        precision: str = MATCHING_PRECISION,
+        projection=None,
+        rerank_factor: int = 0
+    ):
+        self.author_ids = list(author_ids)
+        self.names = list(names)
+        self.index = {author_id: i for i, author_id in enumerate(self.author_ids)}
+
+        profile_matrix = normalize_rows(np.ascontiguousarray(profile_matrix, dtype=np.float32))
+        work_matrix = normalize_rows(np.ascontiguousarray(work_matrix, dtype=np.float32))
+
+        # Rows without a vector are zero after normalization
+        self.has_profile = profile_matrix.any(axis=1)
+        self.has_work = work_matrix.any(axis=1)
+
+        self.profile_matrix = CompactMatrix(profile_matrix, precision)
+        self.work_matrix = CompactMatrix(work_matrix, precision)
+
+        self.reduced_profile: Optional[np.ndarray] = None
+        self.reduced_work: Optional[np.ndarray] = None
+        self.rerank_factor = rerank_factor
+        if projection is not None and rerank_factor > 0:
+            # Zero rows stay zero, so the has_* masks apply unchanged
+            self.reduced_profile = np.where(self.has_profile[:, None], projection.project(profile_matrix), 0)
+            self.reduced_work = np.where(self.has_work[:, None], projection.project(work_matrix), 0)
+
+        self.built_at = time.monotonic()
+        self.version: Optional[int] = None
+
+    @classmethod
+    def from_compact(
+        cls,
+        author_ids: List[str],
+        names: List[str],
+        profile_matrix: CompactMatrix,
+        work_matrix: CompactMatrix,
+        has_profile: np.ndarray,
+        has_work: np.ndarray
+    ) -> 'MatchingEngine':
+        """Wrap already normalized matrices (e.g. a memory-mapped snapshot) without copying them"""
+        engine = cls.__new__(cls)
+        engine.author_ids = list(author_ids)
+        engine.names = list(names)
+        engine.index = {author_id: i for i, author_id in enumerate(engine.author_ids)}
+        engine.profile_matrix = profile_matrix
+        engine.work_matrix = work_matrix
+        engine.has_profile = has_profile
+        engine.has_work = has_work
+        engine.reduced_profile = engine.reduced_work = None
+        engine.rerank_factor = 0
+        engine.built_at = time.monotonic()
+        engine.version = None
+        return engine
+
+    def __len__(self) -> int:
+        return len(self.author_ids)
+
+    @classmethod
+    def from_database(
+        cls,
+        db,
+        dimension: int = 1536,
+        precision: str = MATCHING_PRECISION
+    ) -> 'MatchingEngine':
+        """Load author profiles and stored work centroids with two queries, plus the projection if any"""
+        from projection import PROJECTION_RERANK_FACTOR, get_projection
+
+        authors = db.query(Author.id, Author.name, Author.embedding).all()
+
+        author_ids = [a.id for a in authors]
+        names = [a.name for a in authors]
+        profile_matrix = np.zeros((len(authors), dimension), dtype=np.float32)
+        for i, author in enumerate(authors):
+            if author.embedding is not None:
+                profile_matrix[i] = author.embedding
+
+        # Work centroids are maintained incrementally on ingest, one row per author
+        rows_by_name: Dict[str, List[int]] = {}
+        for i, name in enumerate(names):
+            rows_by_name.setdefault(name, []).append(i)
+
+        work_matrix = np.zeros((len(authors), dimension), dtype=np.float32)
+        if rows_by_name:
+            centroids = db.query(AuthorCentroid.author_name, AuthorCentroid.embedding).filter(
+                AuthorCentroid.author_name.in_(list(rows_by_name)),
+                AuthorCentroid.article_count > 0
+            ).yield_per(1000)
+
+            for centroid in centroids:
+                for row in rows_by_name[centroid.author_name]:
+                    work_matrix[row] = centroid.embedding
+
+        return cls(
+            author_ids, names, profile_matrix, work_matrix, precision,
+            get_projection(db), PROJECTION_RERANK_FACTOR
+        )
+
+    def _score_block(self, rows: np.ndarray):
+        """
+        Similarities of the given rows to every author
+
+        Returns (overall, profile, work, profile_mask, work_mask), each of
+        shape (len(rows), len(self)); overall is the mean of the similarities
+        both sides have vectors for, and -inf for self-pairs and pairs with
+        nothing in common.
+        """
+        profile_scores = self.profile_matrix.scores(self.profile_matrix.rows(rows)).T
+        work_scores = self.work_matrix.scores(self.work_matrix.rows(rows)).T
+
+        profile_mask = self.has_profile[rows][:, None] & self.has_profile[None, :]
+        work_mask = self.has_work[rows][:, None] & self.has_work[None, :]
+
+        total = np.where(profile_mask, profile_scores, 0) + np.where(work_mask, work_scores, 0)
+        count = profile_mask.astype(np.float32) + work_mask
+        overall = np.divide(total, count, out=np.full_like(total, -np.inf), where=count > 0)
+        overall[np.arange(len(rows)), rows] = -np.inf
+        return overall, profile_scores, work_scores, profile_mask, work_mask
+
+    def similarities(self, rows: List[int]) -> np.ndarray:
+        """Overall similarity of each given row to every author (-inf where undefined)"""
+        return self._score_block(np.asarray(rows, dtype=np.int64))[0]
+
+    def rank_many(
+        self,
+        rows: List[int],
+        min_similarity: float,
+        limit: int
+    ) -> List[List[Tuple[int, float, Optional[float], Optional[float]]]]:
+        """
+        Rank candidates for a block of target rows with two matrix products
+
+        Returns:
+            For each target row, (row, overall, profile_similarity,
+            work_similarity) of its top `limit` candidates with
+            overall >= min_similarity, best first
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if limit <= 0 or len(self) < 2 or len(rows) == 0:
+            return [[] for _ in rows]
+
+        overall, profile_scores, work_scores, profile_mask, work_mask = self._score_block(rows)
+
+        ranked = []
+        for i in range(len(rows)):
+            candidates = np.flatnonzero(overall[i] >= min_similarity)
+            if len(candidates) > limit:
+                top = np.argpartition(-overall[i, candidates], limit - 1)[:limit]
+                candidates = candidates[top]
+            candidates = candidates[np.argsort(-overall[i, candidates], kind='stable')]
+
+            ranked.append([
+                (
+                    int(row),
+                    float(overall[i, row]),
+                    float(profile_scores[i, row]) if profile_mask[i, row] else None,
+                    float(work_scores[i, row]) if work_mask[i, row] else None
+                )
+                for row in candidates
+            ])
+        return ranked
+
+    def rank(
+        self,
+        author_id: str,
+        min_similarity: float,
+        limit: int
+    ) -> List[Tuple[int, float, Optional[float], Optional[float]]]:
+        """
+        Score every candidate against the target author
+
+        Returns:
+            List of (row, overall, profile_similarity, work_similarity) for
+            the top `limit` candidates with overall >= min_similarity, best first
+        """
+        target = self.index[author_id]
+        if self.reduced_profile is None:
+            return self.rank_many([target], min_similarity, limit)[0]
+        return self._rank_rows(target, self._shortlist(target, limit * self.rerank_factor), min_similarity, limit)
+
+    def _shortlist(self, target: int, n: int) -> np.ndarray:
+        """The n rows with the highest overall similarity to the target in the projected space"""
+        profile_mask = self.has_profile[target] & self.has_profile
+        work_mask = self.has_work[target] & self.has_work
+        total = np.where(profile_mask, self.reduced_profile @ self.reduced_profile[target], 0) \
+            + np.where(work_mask, self.reduced_work @ self.reduced_work[target], 0)
+        count = profile_mask.astype(np.float32) + work_mask
+        overall = np.divide(total, count, out=np.full_like(total, -np.inf), where=count > 0)
+        overall[target] = -np.inf
+        candidates = np.flatnonzero(overall > -np.inf)
+        if len(candidates) > n:
+            candidates = candidates[np.argpartition(-overall[candidates], n - 1)[:n]]
+        return candidates
+
+    def rank_among(
+        self,
+        author_id: str,
+        candidate_ids: List[str],
+        min_similarity: float,
+        limit: int
+    ) -> List[Tuple[int, float, Optional[float], Optional[float]]]:
+        """
+        Like rank, but only scores the given candidates (see candidates.py),
+        so the cost depends on the candidate set instead of the table size
+        """
+        target = self.index[author_id]
+        return self._rank_rows(
+            target, [self.index[c] for c in candidate_ids if c in self.index], min_similarity, limit
+        )
+
+    def _rank_rows(
+        self,
+        target: int,
+        rows,
+        min_similarity: float,
+        limit: int
+    ) -> List[Tuple[int, float, Optional[float], Optional[float]]]:
+        """Exact scores of the given rows against the target row, ranked like rank_many"""
+        rows = np.array(sorted(set(int(row) for row in rows) - {target}), dtype=np.int64)
+        if limit <= 0 or len(rows) == 0:
+            return []
+
+        profile_scores = self.profile_matrix.rows(rows) @ self.profile_matrix.row(target)
+        work_scores = self.work_matrix.rows(rows) @ self.work_matrix.row(target)
+        profile_mask = self.has_profile[target] & self.has_profile[rows]
+        work_mask = self.has_work[target] & self.has_work[rows]
+
+        total = np.where(profile_mask, profile_scores, 0) + np.where(work_mask, work_scores, 0)
+        count = profile_mask.astype(np.float32) + work_mask
+        overall = np.divide(total, count, out=np.full_like(total, -np.inf), where=count > 0)
+
+        keep = np.flatnonzero(overall >= min_similarity)
+        if len(keep) > limit:
+            keep = keep[np.argpartition(-overall[keep], limit - 1)[:limit]]
+        keep = keep[np.argsort(-overall[keep], kind='stable')]
+        return [
+            (
+                int(rows[i]),
+                float(overall[i]),
+                float(profile_scores[i]) if profile_mask[i] else None,
+                float(work_scores[i]) if work_mask[i] else None
+            )
+            for i in keep
+        ]
+
+    def work_centroid(self, author_id: str) -> Optional[np.ndarray]:
+        """Normalized work centroid for an author, if they have any articles"""
+        row = self.index.get(author_id)
+        if row is None or not self.has_work[row]:
+            return None
+        return self.work_matrix.row(row)
+
+    @property
+    def nbytes(self) -> int:
+        reduced = 0 if self.reduced_profile is None else self.reduced_profile.nbytes + self.reduced_work.nbytes
+        return self.profile_matrix.nbytes + self.work_matrix.nbytes + reduced
+
+
+_engine: Optional[MatchingEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_matching_engine(db, version: Optional[int] = None) -> MatchingEngine:
+    """
+    Return the shared engine, rebuilding it when stale
+
+    Passing the current data version rebuilds as soon as ingest changed the
+    corpus instead of waiting for MATCHING_ENGINE_TTL.
+    """
+    global _engine
+    with _engine_lock:
+        if (
+            _engine is None
+            or (version is not None and _engine.version != version)
+            or time.monotonic() - _engine.built_at > MATCHING_ENGINE_TTL
+        ):
+            _engine = MatchingEngine.from_database(db)
+            _engine.version = version
+        return _engine
+
+
+def invalidate_matching_engine():
+    """Force the next request to rebuild the engine from the database"""
+    global _engine
+    with _engine_lock:
+        _engine = None
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+
+import os
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    Counter,
+    Histogram,
+    generate_latest,
+    write_to_textfile
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event
+
+# CLIs and job workers write their metrics here on exit (and after every job);
+# "{pid}" is replaced so several worker processes don't overwrite each other
+METRICS_FILE = os.getenv('METRICS_FILE')
+
+REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds',
+    'HTTP request latency by route',
+    ['method', 'route', 'status']
+)
+
+STAGE_SECONDS = Histogram(
+    'stage_duration_seconds',
+    'Time spent in each processing stage',
+    ['stage'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+
+ARTICLES = Counter(
+    'articles',
+    'Articles handled by ingest, by outcome (ingested, deduplicated, skipped, failed)',
+    ['outcome']
+)
+
+
+def stage_timer(stage: str):
+    """Context manager (or decorator) timing one stage: embedding, scholarly_fetch, db_query, db_commit"""
+    return STAGE_SECONDS.labels(stage=stage).time()
+
+
+def count_articles(outcome: str, n: int = 1):
+    if n:
+        ARTICLES.labels(outcome=outcome).inc(n)
+
+
+def observe_request(method: str, route: str, status: int, seconds: float):
+    REQUEST_SECONDS.labels(method=method, route=route, status=str(status)).observe(seconds)
+
+
+# Engine name -> pool, read by _PoolCollector
+_pools = {}
+
+
+def instrument_engine(engine, name: str):
+    """Time every statement run on the engine and expose its pool usage"""
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _started(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _finished(conn, cursor, statement, parameters, context, executemany):
+        STAGE_SECONDS.labels(stage='db_query').observe(time.perf_counter() - context._metrics_started)
+
+    _pools[name] = engine.pool
+
+
+class _PoolCollector:
+    """Connection pool gauges, read at scrape time"""
+
+    def collect(self):
+        checked_out = GaugeMetricFamily('db_pool_checked_out', 'Connections currently in use', labels=['engine'])
+        size = GaugeMetricFamily('db_pool_size', 'Configured pool size', labels=['engine'])
+        overflow = GaugeMetricFamily('db_pool_overflow', 'Connections opened beyond the pool size', labels=['engine'])
+        for name, pool in _pools.items():
+            if not hasattr(pool, 'checkedout'):
+                continue
+            checked_out.add_metric([name], pool.checkedout())
+            size.add_metric([name], pool.size())
+            overflow.add_metric([name], max(0, pool.overflow()))
+        yield checked_out
+        yield size
+        yield overflow
+
+
+class _StatsCollector:
+    """Expose a stats() dict as metrics: listed keys as counters, the rest as gauges"""
+
+    def __init__(self, prefix: str, stats: Callable[[], Dict[str, int]], counters: Iterable[str]):
+        self.prefix = prefix
+        self.stats = stats
+        self.counters = set(counters)
+
+    def collect(self):
+        for key, value in self.stats().items():
+            name = f"{self.prefix}_{key}"
+            if key in self.counters:
+                yield CounterMetricFamily(name, f"{self.prefix} {key}", value=value)
+            else:
+                yield GaugeMetricFamily(name, f"{self.prefix} {key}", value=value)
+
+
+REGISTRY.register(_PoolCollector())
+
+
+def register_stats(prefix: str, stats: Callable[[], Dict[str, int]], counters: Iterable[str] = ()):
+    """Publish a cache's stats() under the given metric name prefix"""
+    REGISTRY.register(_StatsCollector(prefix, stats, counters))
+
+
+def render_metrics():
+    """Body and content type for a /metrics response"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def export_metrics(path: Optional[str] = None):
+    """Write all metrics in text format, for the node exporter's textfile collector"""
+    path = path or METRICS_FILE
+    if not path:
+        return
+    try:
+        write_to_textfile(path.format(pid=os.getpid()), REGISTRY)
+    except Exception as e:
+        print(f"Error exporting metrics: {str(e)}")
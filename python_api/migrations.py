@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+
+from contextlib import contextmanager
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from centroids import backfill_centroids
+from db_models import Article, ArticleAuthor, Author, ARTICLE_SEARCH_VECTOR
+from embedding_backends import DEFAULT_OPENAI_MODEL, EMBEDDING_BACKEND, EMBEDDING_MODEL
+from fingerprints import article_fingerprint, title_key
+from interests import reindex_interests
+from vector_index import PROJECTION_DIMENSION, ensure_vector_indexes, index_name
+
+
+# Key of the advisory lock that serializes schema setup across processes
+MIGRATION_LOCK_KEY = 7204251016
+
+
+@contextmanager
+def migration_lock(engine):
+    """
+    Hold a session-level advisory lock while the schema is set up, so that
+    processes starting together (e.g. API workers) migrate one at a time and
+    the later ones find nothing left to do
+
+    The holding connection commits right away, so it waits idle rather than
+    in a transaction; Postgres releases the lock if the process dies.
+    """
+    with engine.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {'key': MIGRATION_LOCK_KEY})
+        conn.commit()
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {'key': MIGRATION_LOCK_KEY})
+            conn.commit()
+
+
+def _column_type(conn, table: str, column: str):
+    """information_schema data type of a column, or None if it doesn't exist"""
+    return conn.execute(text(
+        "SELECT data_type FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = :table AND column_name = :column"
+    ), {'table': table, 'column': column}).scalar()
+
+
+def migrate_article_embeddings(engine):
+    """
+    Convert tables created by the old embed_articles model in place
+
+    That model stored embeddings as float8[] and created_at without a time
+    zone; both are cast to the shared db_models types.
+    """
+    with engine.connect() as conn:
+        if _column_type(conn, 'articles', 'embedding') == 'ARRAY':
+            print("Migrating articles.embedding from float8[] to vector(1536)")
+            conn.execute(text(
+                "ALTER TABLE articles ALTER COLUMN embedding TYPE vector(1536) "
+                "USING embedding::vector(1536)"
+            ))
+        if _column_type(conn, 'articles', 'created_at') == 'timestamp without time zone':
+            conn.execute(text(
+                "ALTER TABLE articles ALTER COLUMN created_at TYPE TIMESTAMP WITH TIME ZONE"
+            ))
+            conn.execute(text("ALTER TABLE articles ALTER COLUMN created_at SET DEFAULT now()"))
+        conn.commit()
+
+
+def add_article_unique_constraint(engine):
+    """
+    Enforce one row per (title, author_name) so bulk loads can use ON CONFLICT
+
+    Duplicates left behind by the old check-then-insert ingest are removed
+    (keeping the oldest row); deduplicate_articles recomputes the centroids.
+    """
+    with engine.connect() as conn:
+        # Superseded by deduplicate_articles once articles no longer have an author_name
+        if _column_type(conn, 'articles', 'author_name') is None:
+            return
+        exists = conn.execute(text(
+            "SELECT 1 FROM pg_constraint WHERE conname = 'articles_title_author_name_key'"
+        )).scalar()
+        if exists:
+            return
+
+        removed = conn.execute(text(
+            "DELETE FROM articles a USING articles b "
+            "WHERE a.title = b.title AND a.author_name = b.author_name AND a.id > b.id"
+        )).rowcount
+        conn.execute(text(
+            "ALTER TABLE articles ADD CONSTRAINT articles_title_author_name_key UNIQUE (title, author_name)"
+        ))
+        conn.commit()
+
+    if removed:
+        print(f"Removed {removed} duplicate articles")
+
+
+def add_article_paging_indexes(engine):
+    """Composite indexes backing keyset pagination on /articles/"""
+    for index in Article.__table__.indexes:
+        if index.name == 'articles_created_at_id_idx':
+            index.create(bind=engine, checkfirst=True)
+
+
+def add_article_search_vector(engine):
+    """Generated tsvector column plus the GIN and filter indexes used by hybrid search"""
+    with engine.connect() as conn:
+        if _column_type(conn, 'articles', 'search_vector') is None:
+            print("Adding articles.search_vector (rewrites the table)")
+            conn.execute(text(
+                f"ALTER TABLE articles ADD COLUMN search_vector tsvector "
+                f"GENERATED ALWAYS AS ({ARTICLE_SEARCH_VECTOR}) STORED"
+            ))
+            conn.commit()
+
+    for index in Article.__table__.indexes:
+        if index.name in ('articles_search_vector_idx', 'articles_year_idx', 'articles_journal_idx'):
+            index.create(bind=engine, checkfirst=True)
+
+
+def add_article_embedding_model(engine):
+    """
+    Record which model produced each embedding
+
+    Embeddings stored before backends were pluggable all came from OpenAI,
+    so they are labelled with the configured OpenAI model at 1536 dimensions.
+    """
+    with engine.connect() as conn:
+        if _column_type(conn, 'articles', 'embedding_model') is not None:
+            return
+        print("Adding articles.embedding_model and articles.embedding_dim")
+        conn.execute(text("ALTER TABLE articles ADD COLUMN embedding_model VARCHAR"))
+        conn.execute(text("ALTER TABLE articles ADD COLUMN embedding_dim INTEGER"))
+        conn.execute(text(
+            "UPDATE articles SET embedding_model = :model, embedding_dim = 1536 "
+            "WHERE embedding IS NOT NULL"
+        ), {'model': EMBEDDING_MODEL if EMBEDDING_BACKEND == 'openai' else DEFAULT_OPENAI_MODEL})
+        conn.commit()
+
+
+def deduplicate_articles(engine, batch_size: int = 5000):
+    """
+    Store each paper once, linked to every author who has it
+
+    Copies of a paper scraped from several co-authors' profiles are merged
+    by fingerprint (see fingerprints.py): the oldest copy is kept, each
+    copy's author is linked to it in article_authors, and the rest are
+    deleted before articles.author_name is dropped.
+    """
+    with engine.connect() as conn:
+        if _column_type(conn, 'articles', 'author_name') is None:
+            return
+        print("Deduplicating articles across authors")
+        if _column_type(conn, 'articles', 'fingerprint') is None:
+            conn.execute(text("ALTER TABLE articles ADD COLUMN fingerprint VARCHAR"))
+            conn.execute(text("ALTER TABLE articles ADD COLUMN title_key VARCHAR"))
+
+        # Keys are computed the same way as for new rows, in keyset-paged batches
+        last_id = 0
+        while True:
+            rows = conn.execute(text(
+                "SELECT id, title, year, url FROM articles WHERE id > :last_id ORDER BY id LIMIT :limit"
+            ), {'last_id': last_id, 'limit': batch_size}).all()
+            if not rows:
+                break
+            conn.execute(text(
+                "UPDATE articles SET fingerprint = :fingerprint, title_key = :title_key WHERE id = :id"
+            ), [
+                {
+                    'id': row.id,
+                    'fingerprint': article_fingerprint(row._asdict()),
+                    'title_key': title_key(row.title, row.year)
+                }
+                for row in rows
+            ])
+            last_id = rows[-1].id
+
+        ArticleAuthor.__table__.create(bind=conn, checkfirst=True)
+        conn.execute(text(
+            "INSERT INTO article_authors (article_id, author_name, created_at) "
+            "SELECT keep.id, a.author_name, min(a.created_at) FROM articles a "
+            "JOIN (SELECT fingerprint, min(id) AS id FROM articles GROUP BY fingerprint) keep "
+            "USING (fingerprint) "
+            "GROUP BY keep.id, a.author_name "
+            "ON CONFLICT DO NOTHING"
+        ))
+        removed = conn.execute(text(
+            "DELETE FROM articles a USING articles b "
+            "WHERE a.fingerprint = b.fingerprint AND a.id > b.id"
+        )).rowcount
+
+        conn.execute(text("ALTER TABLE articles DROP CONSTRAINT IF EXISTS articles_title_author_name_key"))
+        conn.execute(text("ALTER TABLE articles DROP COLUMN author_name"))
+        conn.execute(text("ALTER TABLE articles ALTER COLUMN fingerprint SET NOT NULL"))
+        conn.execute(text("ALTER TABLE articles ALTER COLUMN title_key SET NOT NULL"))
+        conn.execute(text("ALTER TABLE articles ADD CONSTRAINT articles_fingerprint_key UNIQUE (fingerprint)"))
+        conn.commit()
+
+    for index in Article.__table__.indexes:
+        if index.name == 'ix_articles_title_key':
+            index.create(bind=engine, checkfirst=True)
+
+    print(f"Merged {removed} duplicate articles")
+    with Session(engine) as db:
+        backfill_centroids(db)
+
+
+def add_author_profile_columns(engine):
+    """Record what each author's profile vector was built from (see profiles.py)"""
+    with engine.connect() as conn:
+        if _column_type(conn, 'authors', 'embedding_model') is not None:
+            return
+        print("Adding authors.embedding_model, embedding_interests and embedding_updated_at")
+        conn.execute(text("ALTER TABLE authors ADD COLUMN embedding_model VARCHAR"))
+        conn.execute(text("ALTER TABLE authors ADD COLUMN embedding_interests VARCHAR[]"))
+        conn.execute(text("ALTER TABLE authors ADD COLUMN embedding_updated_at TIMESTAMP WITH TIME ZONE"))
+        conn.commit()
+
+
+def add_author_interest_terms(engine):
+    """Normalized interests behind interest-overlap matching candidates, with their GIN index"""
+    with engine.connect() as conn:
+        added = _column_type(conn, 'authors', 'interest_terms') is None
+        if added:
+            print("Adding authors.interest_terms")
+            conn.execute(text("ALTER TABLE authors ADD COLUMN interest_terms VARCHAR[] NOT NULL DEFAULT '{}'"))
+            conn.commit()
+
+    if added:
+        with Session(engine) as db:
+            reindex_interests(db)
+
+    for index in Author.__table__.indexes:
+        if index.name == 'authors_interest_terms_idx':
+            index.create(bind=engine, checkfirst=True)
+
+
+def add_article_embedding_reduced(engine):
+    """
+    Projected copy of each embedding for first-pass search (see projection.py)
+
+    When PROJECTION_DIMENSION changed, the column is retyped and emptied and
+    the stored projections are dropped; `projection.py --train` refills it.
+    """
+    with engine.connect() as conn:
+        if _column_type(conn, 'articles', 'embedding_reduced') is None:
+            print(f"Adding articles.embedding_reduced ({PROJECTION_DIMENSION} dims)")
+            conn.execute(text(f"ALTER TABLE articles ADD COLUMN embedding_reduced vector({PROJECTION_DIMENSION})"))
+            conn.commit()
+            return
+
+        dimension = conn.execute(text(
+            "SELECT atttypmod FROM pg_attribute "
+            "WHERE attrelid = 'articles'::regclass AND attname = 'embedding_reduced'"
+        )).scalar()
+        if dimension == PROJECTION_DIMENSION:
+            return
+        print(f"Resizing articles.embedding_reduced from {dimension} to {PROJECTION_DIMENSION} dims")
+        conn.execute(text(f"DROP INDEX IF EXISTS {index_name('articles', 'embedding_reduced')}"))
+        conn.execute(text(
+            f"ALTER TABLE articles ALTER COLUMN embedding_reduced TYPE vector({PROJECTION_DIMENSION}) USING NULL"
+        ))
+        conn.execute(text("DELETE FROM embedding_projections"))
+        conn.commit()
+
+
+def add_projection_versions(engine):
+    """
+    Version each stored projection and the rows projected with it, so search
+    only trusts embedding_reduced of rows projected with the current one
+
+    Projections stored before get version 1, as do the rows they projected.
+    """
+    with engine.connect() as conn:
+        if _column_type(conn, 'embedding_projections', 'version') is None:
+            print("Adding embedding_projections.version")
+            conn.execute(text("ALTER TABLE embedding_projections ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+            conn.commit()
+        if _column_type(conn, 'articles', 'projection_version') is None:
+            print("Adding articles.projection_version")
+            conn.execute(text("ALTER TABLE articles ADD COLUMN projection_version INTEGER"))
+            conn.execute(text(
+                "UPDATE articles SET projection_version = 1 WHERE embedding_reduced IS NOT NULL"
+            ))
+            conn.commit()
+
+    for index in Article.__table__.indexes:
+        if index.name == 'articles_projection_version_idx':
+            index.create(bind=engine, checkfirst=True)
+
+
+def add_projection_recall(engine):
+    """
+    Recall of search through each projection; ones stored before weren't
+    measured, so first-pass search stays off until `projection.py --evaluate`
+    """
+    with engine.connect() as conn:
+        if _column_type(conn, 'embedding_projections', 'recall') is None:
+            print("Adding embedding_projections.recall")
+            conn.execute(text("ALTER TABLE embedding_projections ADD COLUMN recall DOUBLE PRECISION"))
+            conn.commit()
+
+
+# Applied in order by run_migrations; every step must be idempotent
+MIGRATIONS = [
+    migrate_article_embeddings,
+    add_article_unique_constraint,
+    add_article_paging_indexes,
+    add_article_search_vector,
+    add_article_embedding_model,
+    deduplicate_articles,
+    add_author_profile_columns,
+    add_author_interest_terms,
+    add_article_embedding_reduced,
+    add_projection_versions,
+    add_projection_recall,
+    ensure_vector_indexes,
+]
+
+
+def run_migrations(engine):
+    """Bring an existing database up to the current schema"""
+    for migration in MIGRATIONS:
+        migration(engine)
+
+
+def main():
+    from embed_articles import setup_database
+
+    # setup_database creates missing tables and runs every migration
+    setup_database()
+    print("Database is up to date")
+
+
+if __name__ == "__main__":
+    main()
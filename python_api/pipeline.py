@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from embed_articles import SessionLocal, process_articles, store_processed_articles, EMBEDDING_BATCH_SIZE
+from metrics import count_articles
+from rate_limit import TokenBucket, scholar_rate_limiter, fill_publication, SCHOLAR_FETCH_WORKERS
+from scraper import publication_data
+
+# Bounded queues between stages; a full queue blocks the stage feeding it
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '64'))
+# Embed a partial batch once its oldest publication has waited this many seconds
+PIPELINE_FLUSH_SECONDS = float(os.getenv('PIPELINE_FLUSH_SECONDS', '10'))
+
+_DONE = object()
+
+
+class IngestPipeline:
+    """
+    Staged ingest for one author's publications
+
+    fetch (N threads, shared token bucket) -> embed (batched) -> write (bulk
+    insert), connected by bounded queues so a slow stage applies backpressure
+    to the ones before it. Embedding and writing overlap with fetching, so
+    total time is dominated by the fetch rate limit.
+    """
+
+    def __init__(
+        self,
+        author_name: str,
+        bucket: TokenBucket = scholar_rate_limiter,
+        fetch_workers: int = SCHOLAR_FETCH_WORKERS,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        queue_size: int = PIPELINE_QUEUE_SIZE,
+        flush_seconds: float = PIPELINE_FLUSH_SECONDS,
+        on_written: Optional[Callable[[int], None]] = None
+    ):
+        self.author_name = author_name
+        self.bucket = bucket
+        self.fetch_workers = fetch_workers
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.on_written = on_written
+
+        self._pubs: "queue.Queue" = queue.Queue()
+        self._to_embed: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._to_write: "queue.Queue" = queue.Queue(maxsize=max(1, queue_size // batch_size))
+
+        self.fetched = 0
+        self.failed = 0
+        self.written = 0
+        self.errors: List[str] = []
+        self._lock = threading.Lock()
+
+    def _fetch_stage(self):
+        while True:
+            pub = self._pubs.get()
+            if pub is _DONE:
+                return
+            # A malformed publication is counted as failed; the fetcher keeps draining the queue
+            try:
+                pub_complete = fill_publication(pub, self.bucket)
+                data = publication_data(pub_complete) if pub_complete is not None else None
+            except Exception as e:
+                self._record_error(f"Error fetching publication: {str(e)}")
+                data = None
+            with self._lock:
+                if data is None:
+                    self.failed += 1
+                    count_articles('failed')
+                else:
+                    self.fetched += 1
+            if data is not None:
+                self._to_embed.put(data)
+
+    def _embed_stage(self):
+        batch: List[Dict] = []
+        batch_started = 0.0
+        done = False
+        while not done:
+            timeout = self.flush_seconds
+            if batch:
+                timeout = max(0.0, batch_started + self.flush_seconds - time.monotonic())
+            try:
+                item = self._to_embed.get(timeout=timeout)
+                if item is _DONE:
+                    done = True
+                else:
+                    if not batch:
+                        batch_started = time.monotonic()
+                    batch.append(item)
+            except queue.Empty:
+                pass
+
+            # Flush full batches, batches that have waited long enough, and the remainder
+            full = len(batch) >= self.batch_size
+            stale = batch and time.monotonic() - batch_started >= self.flush_seconds
+            if batch and (full or stale or done):
+                try:
+                    self._to_write.put(process_articles(batch, self.author_name))
+                except Exception as e:
+                    self._record_error(f"Error embedding batch: {str(e)}")
+                batch = []
+
+        self._to_write.put(_DONE)
+
+    def _write_stage(self):
+        # Failures are recorded and the batch skipped, but the queue is always
+        # drained up to _DONE so the embed stage never blocks on a dead writer
+        db = None
+        try:
+            while True:
+                processed = self._to_write.get()
+                if processed is _DONE:
+                    return
+                try:
+                    if db is None:
+                        db = SessionLocal()
+                    written = store_processed_articles(db, processed)
+                except Exception as e:
+                    self._record_error(f"Error writing batch: {str(e)}")
+                    db = self._discard_session(db)
+                    continue
+                self.written += written
+                if self.on_written:
+                    try:
+                        self.on_written(written)
+                    except Exception as e:
+                        self._record_error(f"Error reporting progress: {str(e)}")
+        finally:
+            self._discard_session(db)
+
+    def _discard_session(self, db) -> None:
+        """Roll back and close a session whose connection may be broken; the next batch opens a new one"""
+        if db is None:
+            return None
+        try:
+            db.rollback()
+            db.close()
+        except Exception as e:
+            print(f"Error closing session: {str(e)}")
+        return None
+
+    def _record_error(self, message: str):
+        print(message)
+        with self._lock:
+            self.errors.append(message)
+
+    def run(self, pubs: List[Dict]) -> Dict[str, int]:
+        """Ingest the given (unfilled) publications and block until all stages finish"""
+        started = time.monotonic()
+        for pub in pubs:
+            self._pubs.put(pub)
+        for _ in range(self.fetch_workers):
+            self._pubs.put(_DONE)
+
+        fetchers = [
+            threading.Thread(target=self._fetch_stage, daemon=True)
+            for _ in range(self.fetch_workers)
+        ]
+        embedder = threading.Thread(target=self._embed_stage, daemon=True)
+        writer = threading.Thread(target=self._write_stage, daemon=True)
+        for thread in fetchers + [embedder, writer]:
+            thread.start()
+
+        for thread in fetchers:
+            thread.join()
+        self._to_embed.put(_DONE)
+        embedder.join()
+        writer.join()
+
+        return {
+            'publications': len(pubs),
+            'fetched': self.fetched,
+            'failed': self.failed,
+            'written': self.written,
+            'seconds': round(time.monotonic() - started, 2),
+        }
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import bindparam, exists, func, or_, select
+from sqlalchemy.dialects.postgresql import insert
+
+from data_version import bump_data_version
+from db_models import Author, AuthorCentroid, InterestTerm
+from embed_articles import SessionLocal, get_embeddings, setup_database
+from embedding_backends import EMBEDDING_MODEL
+from interests import normalize_interests
+from matching import normalize_rows
+
+# Share of the profile vector given to the interests; the rest goes to the work centroid
+PROFILE_INTEREST_WEIGHT = float(os.getenv('PROFILE_INTEREST_WEIGHT', '0.5'))
+# Authors recomputed per transaction
+PROFILE_BATCH_SIZE = int(os.getenv('PROFILE_BATCH_SIZE', '500'))
+
+
+def interest_vectors(db, terms: Iterable[str]) -> Dict[str, np.ndarray]:
+    """
+    Embeddings of normalized interest terms, from the vocabulary table
+
+    Terms not in the vocabulary yet are embedded in one batched call and
+    added to it (in the caller's transaction). Terms whose embedding failed
+    are left out.
+    """
+    terms = sorted(set(terms))
+    vectors = {
+        term: np.asarray(embedding, dtype=np.float64)
+        for term, embedding in db.execute(
+            select(InterestTerm.term, InterestTerm.embedding).where(
+                InterestTerm.embedding_model == EMBEDDING_MODEL,
+                InterestTerm.term.in_(terms)
+            )
+        )
+    }
+    missing = [term for term in terms if term not in vectors]
+    if missing:
+        rows = [
+            {'term': term, 'embedding_model': EMBEDDING_MODEL, 'embedding': embedding}
+            for term, embedding in zip(missing, get_embeddings(missing))
+            if embedding is not None
+        ]
+        if rows:
+            db.execute(insert(InterestTerm).values(rows).on_conflict_do_nothing())
+        for row in rows:
+            vectors[row['term']] = np.asarray(row['embedding'], dtype=np.float64)
+    return vectors
+
+
+def compose_profile(
+    interests: Sequence[np.ndarray],
+    centroid: Optional[np.ndarray],
+    interest_weight: float = PROFILE_INTEREST_WEIGHT
+) -> Optional[np.ndarray]:
+    """
+    Normalized weighted mean of an author's interest vectors and work centroid
+
+    Each interest counts equally; an author with only one of the two gets
+    that one alone. Returns None when there is neither.
+    """
+    parts = []
+    if len(interests):
+        mean = normalize_rows(np.array(interests, dtype=np.float64)).mean(axis=0)
+        parts.append(interest_weight * normalize_rows(mean[None, :])[0])
+    if centroid is not None:
+        parts.append((1 - interest_weight) * normalize_rows(np.array([centroid], dtype=np.float64))[0])
+    if not parts:
+        return None
+    return normalize_rows(sum(parts)[None, :])[0]
+
+
+def stale_profiles():
+    """
+    Authors whose profile vector has to be rebuilt: never built, built from
+    other interests or another model, or older than their work centroid
+    """
+    return or_(
+        Author.embedding_updated_at.is_(None),
+        Author.embedding_model.is_distinct_from(EMBEDDING_MODEL),
+        Author.embedding_interests.is_distinct_from(Author.interests),
+        exists().where(
+            AuthorCentroid.author_name == Author.name,
+            AuthorCentroid.updated_at > Author.embedding_updated_at
+        )
+    )
+
+
+def refresh_profiles(
+    db,
+    full: bool = False,
+    author_ids: Optional[List[str]] = None,
+    batch_size: int = PROFILE_BATCH_SIZE
+) -> int:
+    """
+    Rebuild Author.embedding for stale authors (or all with full), in batches
+
+    Interest vectors come from the vocabulary table, so only interests no
+    author had before cost an embedding call. Every batch is written with
+    one executemany and committed with a corpus version bump.
+
+    Returns:
+        int: Number of authors whose profile was rebuilt
+    """
+    query = select(Author.id, Author.name, Author.interests)
+    if not full:
+        query = query.where(stale_profiles())
+    if author_ids:
+        query = query.where(Author.id.in_(author_ids))
+
+    table = Author.__table__
+    refreshed = 0
+    last_id = ''
+    while True:
+        authors = db.execute(
+            query.where(Author.id > last_id).order_by(Author.id).limit(batch_size)
+        ).all()
+        if not authors:
+            return refreshed
+        last_id = authors[-1].id
+
+        terms = {author.id: normalize_interests(author.interests) for author in authors}
+        vectors = interest_vectors(db, [term for author_terms in terms.values() for term in author_terms])
+        centroids = {
+            name: np.asarray(embedding, dtype=np.float64)
+            for name, embedding in db.execute(
+                select(AuthorCentroid.author_name, AuthorCentroid.embedding).where(
+                    AuthorCentroid.author_name.in_({author.name for author in authors}),
+                    AuthorCentroid.article_count > 0
+                )
+            )
+        }
+
+        now = datetime.now(timezone.utc)
+        rows = []
+        for author in authors:
+            profile = compose_profile(
+                [vectors[term] for term in terms[author.id] if term in vectors],
+                centroids.get(author.name)
+            )
+            rows.append({
+                'b_id': author.id,
+                'b_embedding': profile,
+                'b_embedding_model': EMBEDDING_MODEL,
+                'b_embedding_interests': author.interests,
+                'b_embedding_updated_at': now
+            })
+        db.execute(
+            table.update().where(table.c.id == bindparam('b_id')).values(
+                embedding=bindparam('b_embedding', type_=table.c.embedding.type),
+                embedding_model=bindparam('b_embedding_model'),
+                embedding_interests=bindparam('b_embedding_interests', type_=table.c.embedding_interests.type),
+                embedding_updated_at=bindparam('b_embedding_updated_at')
+            ),
+            rows
+        )
+        bump_data_version(db)
+        db.commit()
+        refreshed += len(authors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build author profile vectors from cached interest embeddings")
+    parser.add_argument('--full', action='store_true', help="Rebuild every author, not just stale ones")
+    parser.add_argument('--author', action='append', help="Limit to this scholar id (repeatable)")
+    args = parser.parse_args()
+
+    setup_database()
+    db = SessionLocal()
+    try:
+        refreshed = refresh_profiles(db, full=args.full, author_ids=args.author)
+        vocabulary = db.query(func.count()).select_from(InterestTerm).filter(
+            InterestTerm.embedding_model == EMBEDDING_MODEL
+        ).scalar()
+        print(f"Rebuilt {refreshed} author profiles from {vocabulary} interest vectors")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import threading
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import bindparam, delete, func, or_, select, text
+from sqlalchemy.dialects.postgresql import insert
+
+from data_version import bump_data_version
+from db_models import Article, EmbeddingProjection
+from embedding_backends import EMBEDDING_MODEL
+from matching import normalize_rows
+from vector_index import PROJECTION_DIMENSION, VECTOR_DIMENSION, ensure_vector_indexes, index_name
+
+# 'pca' (trained on stored embeddings) or 'random' (Gaussian, needs no data)
+PROJECTION_METHOD = os.getenv('PROJECTION_METHOD', 'pca')
+# Embeddings sampled to train the projection and to measure its recall
+PROJECTION_SAMPLE_SIZE = int(os.getenv('PROJECTION_SAMPLE_SIZE', '50000'))
+# First-pass candidates per result, reranked by exact cosine on full vectors; 0 disables the first pass
+PROJECTION_RERANK_FACTOR = int(os.getenv('PROJECTION_RERANK_FACTOR', '10'))
+# Search and matching only use a projection whose recall@k through the search SQL, recorded
+# by `projection.py --train/--evaluate`, reaches this; a lower recall isn't worth the speed
+PROJECTION_MIN_RECALL = float(os.getenv('PROJECTION_MIN_RECALL', '0.9'))
+PROJECTION_BATCH_SIZE = int(os.getenv('PROJECTION_BATCH_SIZE', '2000'))
+
+
+class Projection:
+    """
+    Linear map of normalized embeddings to a few dimensions: (x - mean) @ components.T
+
+    Cosine similarity of projected vectors approximates that of the full
+    ones well enough to shortlist candidates for an exact rerank. Rows are
+    stamped with the version of the projection they were projected with.
+    """
+
+    def __init__(
+        self,
+        method: str,
+        mean: np.ndarray,
+        components: np.ndarray,
+        model: str = EMBEDDING_MODEL,
+        version: int = 0
+    ):
+        self.method = method
+        self.model = model
+        self.version = version
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.components = np.ascontiguousarray(components, dtype=np.float32)
+
+    @property
+    def dimension(self) -> int:
+        return self.components.shape[0]
+
+    def project(self, vectors) -> np.ndarray:
+        """Projected, L2-normalized rows of a (n x 1536) matrix"""
+        vectors = normalize_rows(np.array(vectors, dtype=np.float32, ndmin=2))
+        return normalize_rows((vectors - self.mean) @ self.components.T)
+
+    def project_one(self, vector: Sequence[float]) -> np.ndarray:
+        return self.project([vector])[0]
+
+    @classmethod
+    def from_row(cls, row: EmbeddingProjection) -> 'Projection':
+        return cls(
+            row.method,
+            np.frombuffer(row.mean, dtype=np.float32),
+            np.frombuffer(row.components, dtype=np.float32).reshape(row.dimension, -1),
+            row.embedding_model,
+            row.version
+        )
+
+
+def train_projection(
+    vectors: np.ndarray,
+    method: str = PROJECTION_METHOD,
+    dimension: int = PROJECTION_DIMENSION,
+    seed: int = 0
+) -> Projection:
+    """
+    Fit a projection to a sample of embeddings
+
+    pca keeps the directions of largest variance (eigenvectors of the
+    covariance, which is only 1536 x 1536 however large the sample is);
+    random is a scaled Gaussian matrix that preserves angles in expectation.
+    """
+    vectors = normalize_rows(np.array(vectors, dtype=np.float32, ndmin=2))
+    if method == 'pca':
+        mean = vectors.mean(axis=0)
+        centered = (vectors - mean).astype(np.float64)
+        eigenvalues, eigenvectors = np.linalg.eigh(centered.T @ centered)
+        components = eigenvectors[:, np.argsort(-eigenvalues)[:dimension]].T
+    elif method == 'random':
+        mean = np.zeros(vectors.shape[1], dtype=np.float32)
+        components = np.random.default_rng(seed).standard_normal((dimension, vectors.shape[1])) / np.sqrt(dimension)
+    else:
+        raise ValueError(f"Unknown projection method: {method}")
+    return Projection(method, mean, components)
+
+
+def two_stage_top_k(
+    vectors: np.ndarray,
+    reduced: np.ndarray,
+    query: np.ndarray,
+    query_reduced: np.ndarray,
+    k: int,
+    rerank_factor: int
+) -> np.ndarray:
+    """Indices of the top k rows: shortlist k * rerank_factor by reduced score, then rerank exactly"""
+    shortlist = min(len(reduced), k * rerank_factor)
+    candidates = np.argpartition(-(reduced @ query_reduced), shortlist - 1)[:shortlist]
+    scores = vectors[candidates] @ query
+    return candidates[np.argsort(-scores, kind='stable')[:k]]
+
+
+def recall_at_k(
+    vectors: np.ndarray,
+    projection: Projection,
+    queries: np.ndarray,
+    k: int = 10,
+    rerank_factors: Sequence[int] = (1, 4, 10, 20)
+) -> Dict[int, float]:
+    """
+    Fraction of the exact cosine top k found by the two-stage search, per rerank factor
+
+    Query rows that also occur in vectors should be held out by the caller.
+    """
+    vectors = normalize_rows(np.array(vectors, dtype=np.float32))
+    queries = normalize_rows(np.array(queries, dtype=np.float32))
+    reduced = projection.project(vectors)
+    queries_reduced = projection.project(queries)
+    k = min(k, len(vectors))
+
+    exact = [set(np.argpartition(-(vectors @ q), k - 1)[:k]) for q in queries]
+    recalls = {}
+    for factor in rerank_factors:
+        found = [
+            two_stage_top_k(vectors, reduced, q, q_reduced, k, factor)
+            for q, q_reduced in zip(queries, queries_reduced)
+        ]
+        recalls[factor] = round(float(np.mean([len(exact[i] & set(f)) / k for i, f in enumerate(found)])), 4)
+    return recalls
+
+
+_cached: Optional[Projection] = None
+_cache_lock = threading.Lock()
+
+
+def get_projection(db, min_recall: Optional[float] = PROJECTION_MIN_RECALL) -> Optional[Projection]:
+    """
+    The current model's projection, or None when first-pass search is off,
+    none is stored (e.g. while retraining) or its recorded recall is below
+    min_recall; with min_recall None (to keep rows projected) any is returned
+
+    Checks the stored version on every call, a primary key lookup, and only
+    loads the matrices again when it changed. Takes a sync session; async
+    callers use `await db.run_sync(get_projection)`.
+    """
+    global _cached
+    if PROJECTION_RERANK_FACTOR <= 0:
+        return None
+    stored = db.execute(
+        select(EmbeddingProjection.version, EmbeddingProjection.dimension, EmbeddingProjection.recall).where(
+            EmbeddingProjection.embedding_model == EMBEDDING_MODEL
+        )
+    ).first()
+    if stored is None or stored.dimension != PROJECTION_DIMENSION:
+        return None
+    if min_recall is not None and (stored.recall is None or stored.recall < min_recall):
+        return None
+    with _cache_lock:
+        if _cached is None or _cached.version != stored.version:
+            row = db.get(EmbeddingProjection, EMBEDDING_MODEL, populate_existing=True)
+            _cached = Projection.from_row(row) if row is not None else None
+        return _cached
+
+
+def not_projected_with(projection: Projection):
+    """
+    WHERE clause for rows whose embedding_reduced is missing or from another
+    projection; written as ranges so the projection_version index serves it
+    """
+    return or_(
+        Article.projection_version.is_(None),
+        Article.projection_version < projection.version,
+        Article.projection_version > projection.version
+    )
+
+
+def next_projection_version(db) -> int:
+    """A version no stored projection or projected row uses"""
+    return db.execute(select(func.greatest(
+        select(func.coalesce(func.max(EmbeddingProjection.version), 0)).scalar_subquery(),
+        select(func.coalesce(func.max(Article.projection_version), 0)).scalar_subquery()
+    ) + 1)).scalar()
+
+
+def save_projection(db, projection: Projection, trained_on: int):
+    """Store the projection as the current model's (caller commits)"""
+    values = {
+        'method': projection.method,
+        'dimension': projection.dimension,
+        'mean': projection.mean.tobytes(),
+        'components': projection.components.tobytes(),
+        'trained_on': trained_on,
+        'version': projection.version,
+        'created_at': func.now(),
+    }
+    statement = insert(EmbeddingProjection).values(embedding_model=projection.model, **values)
+    db.execute(statement.on_conflict_do_update(index_elements=['embedding_model'], set_=values))
+
+
+def sample_embeddings(db, size: int = PROJECTION_SAMPLE_SIZE) -> np.ndarray:
+    """Random sample of the current model's stored article embeddings"""
+    rows = db.execute(
+        select(Article.embedding).where(
+            Article.embedding_model == EMBEDDING_MODEL,
+            Article.embedding.isnot(None)
+        ).order_by(func.random()).limit(size)
+    ).scalars().all()
+    return np.array(rows, dtype=np.float32).reshape(-1, VECTOR_DIMENSION)
+
+
+def project_articles(db, projection: Projection, batch_size: int = PROJECTION_BATCH_SIZE) -> int:
+    """
+    Write embedding_reduced for the stored articles of the projection's model
+    not yet projected with it, in keyset-paged batches, one executemany and
+    commit per batch
+
+    Returns:
+        int: Number of articles projected
+    """
+    table = Article.__table__
+    projected = 0
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(Article.id, Article.embedding).where(
+                Article.id > last_id,
+                Article.embedding_model == projection.model,
+                Article.embedding.isnot(None),
+                not_projected_with(projection)
+            ).order_by(Article.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        reduced = projection.project([row.embedding for row in rows])
+        db.execute(
+            table.update().where(table.c.id == bindparam('b_id')).values(
+                embedding_reduced=bindparam('b_embedding_reduced', type_=table.c.embedding_reduced.type),
+                projection_version=projection.version
+            ),
+            [{'b_id': row.id, 'b_embedding_reduced': vector} for row, vector in zip(rows, reduced)]
+        )
+        db.commit()
+        projected += len(rows)
+    return projected
+
+
+def retrain(engine, db, method: str = PROJECTION_METHOD, sample_size: int = PROJECTION_SAMPLE_SIZE) -> Optional[Projection]:
+    """
+    Train a projection for the current model under a new version, project
+    every article with it, then store it
+
+    The old projection is removed first, so search uses the full-dimension
+    index while the rows are rewritten; the first-pass index is dropped
+    meanwhile and rebuilt afterwards, which is much faster than updating it
+    row by row. Articles ingested during the rewrite are projected last.
+    """
+    sample = sample_embeddings(db, sample_size)
+    if method == 'pca' and len(sample) < PROJECTION_DIMENSION:
+        print(f"Need at least {PROJECTION_DIMENSION} embedded articles to train a projection, have {len(sample)}")
+        return None
+
+    projection = train_projection(sample, method)
+    projection.version = next_projection_version(db)
+    db.execute(delete(EmbeddingProjection).where(EmbeddingProjection.embedding_model == projection.model))
+    db.execute(text(f"DROP INDEX IF EXISTS {index_name('articles', 'embedding_reduced')}"))
+    db.commit()
+
+    projected = project_articles(db, projection)
+    ensure_vector_indexes(engine)
+    save_projection(db, projection, len(sample))
+    bump_data_version(db)
+    db.commit()
+    projected += project_articles(db, projection)
+    print(f"Trained {method} projection to {projection.dimension} dims on {len(sample)} embeddings; "
+          f"projected {projected} articles")
+    return projection
+
+
+def backfill_projection(db) -> int:
+    """
+    Project the articles stored without the current projection, e.g. while
+    it was being retrained or by a process holding an older one
+
+    Returns:
+        int: Number of articles projected
+    """
+    projection = get_projection(db, min_recall=None)
+    if projection is None:
+        return 0
+    return project_articles(db, projection)
+
+
+def evaluate(db, k: int = 10, rerank_factors: Sequence[int] = (1, 4, 10, 20), queries: int = 200) -> Dict[str, Dict[int, float]]:
+    """
+    Recall@k of the stored projection and of a freshly drawn random one, on a
+    sample of stored embeddings with held-out queries
+    """
+    sample = sample_embeddings(db)
+    if len(sample) <= queries:
+        raise ValueError(f"Need more than {queries} embedded articles to evaluate, have {len(sample)}")
+    corpus, held_out = sample[queries:], sample[:queries]
+
+    configurations = {'random': train_projection(corpus, 'random')}
+    stored = db.get(EmbeddingProjection, EMBEDDING_MODEL)
+    if stored is not None:
+        configurations[f"stored ({stored.method})"] = Projection.from_row(stored)
+    return {
+        name: recall_at_k(corpus, projection, held_out, k, rerank_factors)
+        for name, projection in configurations.items()
+    }
+
+
+def sql_recall_at_k(db, k: int = 10, queries: int = 50) -> Dict[str, float]:
+    """
+    Recall@k of the statements search actually runs against an exact scan:
+    the default ANN path, and the projected first pass with its rerank once
+    a projection is stored (whatever its recorded recall)
+
+    Each statement gets its own transaction, so ef_search is widened for it
+    exactly as in the API. Queries are midpoints of random pairs of stored
+    embeddings, so they aren't rows of the table themselves.
+    """
+    from search import nearest_articles
+
+    sample = sample_embeddings(db, 2 * queries)
+    if len(sample) < 2 * queries:
+        raise ValueError(f"Need at least {2 * queries} embedded articles to evaluate, have {len(sample)}")
+    points = normalize_rows(sample[:queries] + sample[queries:])
+
+    paths = {'ann': None}
+    projection = get_projection(db, min_recall=None)
+    if projection is not None:
+        paths['projected'] = projection
+    found = {name: [] for name in paths}
+    for point in points.tolist():
+        exact = set(db.execute(nearest_articles(point, k, exact=True)).scalars())
+        db.rollback()
+        for name, path_projection in paths.items():
+            ids = set(db.execute(nearest_articles(point, k, projection=path_projection)).scalars())
+            db.rollback()
+            found[name].append(len(exact & ids) / max(len(exact), 1))
+    return {name: round(float(np.mean(recalls)), 4) for name, recalls in found.items()}
+
+
+def record_recall(db, k: int = 10, queries: int = 50) -> Dict[str, float]:
+    """
+    Measure sql_recall_at_k and store the projected path's recall with the
+    projection it was measured on, which turns first-pass search on or off
+
+    Returns:
+        Dict[str, float]: Recall per search path, as sql_recall_at_k
+    """
+    recalls = sql_recall_at_k(db, k, queries)
+    projection = get_projection(db, min_recall=None)
+    if projection is not None and 'projected' in recalls:
+        db.execute(
+            EmbeddingProjection.__table__.update().where(
+                EmbeddingProjection.embedding_model == projection.model,
+                EmbeddingProjection.version == projection.version
+            ).values(recall=recalls['projected'])
+        )
+        db.commit()
+    return recalls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the reduced-dimension projection used for first-pass search")
+    parser.add_argument('--train', action='store_true', help="Train, store and apply a projection for the current model")
+    parser.add_argument('--method', choices=('pca', 'random'), default=PROJECTION_METHOD)
+    parser.add_argument('--sample', type=int, default=PROJECTION_SAMPLE_SIZE, help="Embeddings to train on")
+    parser.add_argument('--backfill', action='store_true',
+                        help="Project the articles stored without the current projection")
+    parser.add_argument('--evaluate', action='store_true',
+                        help="Report recall@k of two-stage search and record it with the stored projection")
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--rerank', default='1,4,10,20', help="Comma-separated rerank factors to evaluate")
+    parser.add_argument('--queries', type=int, default=50, help="Queries run through the search SQL when evaluating")
+    args = parser.parse_args()
+
+    if not (args.train or args.backfill or args.evaluate):
+        parser.print_help()
+        return
+
+    from embed_articles import SessionLocal, engine, setup_database
+
+    setup_database()
+    db = SessionLocal()
+    try:
+        if args.train:
+            trained = retrain(engine, db, args.method, args.sample)
+            # A new projection is only used once its recall is known
+            if trained is not None and not args.evaluate:
+                for name, value in record_recall(db, args.k, args.queries).items():
+                    print(f"search sql, {name}: recall@{args.k} {value:.3f}")
+        if args.backfill:
+            print(f"Projected {backfill_projection(db)} articles")
+        if args.evaluate:
+            factors = [int(f) for f in args.rerank.split(',')]
+            for name, recalls in evaluate(db, args.k, factors).items():
+                print(f"{name} ({PROJECTION_DIMENSION} dims): " + "  ".join(
+                    f"rerank x{factor} recall@{args.k} {value:.3f}" for factor, value in recalls.items()
+                ))
+            for name, value in record_recall(db, args.k, args.queries).items():
+                print(f"search sql, {name}: recall@{args.k} {value:.3f}")
+        if args.train or args.evaluate:
+            enabled = get_projection(db) is not None
+            print(f"First-pass search is {'on' if enabled else 'off'} (PROJECTION_MIN_RECALL={PROJECTION_MIN_RECALL})")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+from typing import Optional
+
+import numpy as np
+
+PRECISIONS = ('float32', 'float16', 'int8')
+
+# Rows expanded per matrix-vector block; small enough for the block to stay in cache
+_BLOCK_ROWS = 1024
+
+
+class CompactMatrix:
+    """
+    Row vectors stored at reduced precision
+
+    float16 halves the memory of a float32 matrix; int8 quarters it, with one
+    float32 scale per row (symmetric quantization of each row's max |value|
+    to 127). Scores are computed blockwise in float32, so only one block is
+    ever expanded at a time; int8 scales are applied to the products rather
+    than the block. Expanding the blocks still costs time: compact scoring
+    is about 2x slower than float32, so this trades latency for memory.
+    """
+
+    def __init__(self, matrix: np.ndarray, precision: str = 'float32'):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision: {precision}")
+        matrix = np.asarray(matrix, dtype=np.float32)
+        self.precision = precision
+        self.shape = matrix.shape
+        self.scales: Optional[np.ndarray] = None
+
+        if precision == 'float32':
+            self.data = np.ascontiguousarray(matrix)
+        elif precision == 'float16':
+            self.data = matrix.astype(np.float16)
+        else:
+            peak = np.abs(matrix).max(axis=1)
+            self.scales = np.where(peak > 0, peak / 127, 1).astype(np.float32)
+            self.data = np.round(matrix / self.scales[:, None]).astype(np.int8)
+
+    @classmethod
+    def wrap(cls, data: np.ndarray, scales: Optional[np.ndarray] = None) -> 'CompactMatrix':
+        """Use already quantized (e.g. memory-mapped) arrays as they are, without copying"""
+        matrix = cls.__new__(cls)
+        matrix.precision = str(data.dtype)
+        if matrix.precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision: {matrix.precision}")
+        matrix.shape = data.shape
+        matrix.data = data
+        matrix.scales = scales
+        return matrix
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def row(self, i: int) -> np.ndarray:
+        """One row as float32"""
+        return self.rows([i])[0]
+
+    def rows(self, indices) -> np.ndarray:
+        """Selected rows as a float32 matrix"""
+        rows = self.data[indices].astype(np.float32)
+        if self.scales is not None:
+            rows *= self.scales[indices, None]
+        return rows
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """
+        Dot product of every row with the query, or with each row of a
+        (queries x dimension) matrix, giving a (rows x queries) result
+        """
+        query = np.asarray(query, dtype=np.float32).T
+        if self.precision == 'float32':
+            return self.data @ query
+        out = np.empty((len(self),) + query.shape[1:], dtype=np.float32)
+        for start in range(0, len(self), _BLOCK_ROWS):
+            stop = min(start + _BLOCK_ROWS, len(self))
+            out[start:stop] = self.data[start:stop].astype(np.float32) @ query
+        if self.scales is not None:
+            out *= self.scales.reshape((-1,) + (1,) * (out.ndim - 1))
+        return out
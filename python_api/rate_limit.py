@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import scholarly
+
+from metrics import stage_timer
+
+# Google Scholar request budget shared by every fetcher in the process
+SCHOLAR_RATE = float(os.getenv('SCHOLAR_RATE', '0.5'))  # Requests per second
+SCHOLAR_BURST = float(os.getenv('SCHOLAR_BURST', '1'))
+SCHOLAR_FETCH_WORKERS = int(os.getenv('SCHOLAR_FETCH_WORKERS', '2'))
+SCHOLAR_FETCH_RETRIES = int(os.getenv('SCHOLAR_FETCH_RETRIES', '3'))
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket with adaptive backoff
+
+    Each throttling signal halves the refill rate (down to min_rate) and
+    pauses all callers for backoff seconds; every success recovers a tenth
+    of the base rate until it is back at the configured value.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float = 1,
+        min_rate: Optional[float] = None,
+        backoff: float = 30.0
+    ):
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate if min_rate is not None else rate / 16
+        self.backoff = backoff
+
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Block until a token is available and take it"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._blocked_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._blocked_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(wait)
+
+    def throttled(self):
+        """Record a throttling response: slow down and pause"""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = 0
+            self._blocked_until = time.monotonic() + self.backoff
+
+    def succeeded(self):
+        """Record a successful request: recover towards the base rate"""
+        with self._lock:
+            self.rate = min(self.base_rate, self.rate + self.base_rate / 10)
+
+
+scholar_rate_limiter = TokenBucket(rate=SCHOLAR_RATE, capacity=SCHOLAR_BURST)
+
+
+def fill_publication(pub: Dict, bucket: TokenBucket = scholar_rate_limiter) -> Optional[Dict]:
+    """
+    Fill one publication within the shared rate limit
+
+    Failures are treated as throttling (scholarly surfaces blocks as generic
+    errors) and retried after backoff; None is returned if every try fails.
+    """
+    for attempt in range(SCHOLAR_FETCH_RETRIES):
+        bucket.acquire()
+        try:
+            with stage_timer('scholarly_fetch'):
+                pub_complete = scholarly.fill(pub)
+            bucket.succeeded()
+            return pub_complete
+        except Exception as e:
+            print(f"Error filling publication (attempt {attempt + 1}): {str(e)}")
+            bucket.throttled()
+    return None
+
+
+def fill_publications(
+    pubs: List[Dict],
+    bucket: TokenBucket = scholar_rate_limiter,
+    workers: int = SCHOLAR_FETCH_WORKERS,
+    fill: Callable[[Dict, TokenBucket], Optional[Dict]] = fill_publication
+) -> List[Optional[Dict]]:
+    """Fill publications concurrently within the rate limit, preserving order"""
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda pub: fill(pub, bucket), pubs))
@@ -3,9 +3,23 @@
 import scholarly
 import json
 from typing import List, Dict
-import time
 from pathlib import Path
 
+from metrics import export_metrics, stage_timer
+from rate_limit import fill_publications
+
+def publication_data(pub_complete: Dict) -> Dict:
+    """Flatten a filled scholarly publication into the article dict used for embedding"""
+    return {
+        'title': pub_complete['bib'].get('title'),
+        'author': pub_complete['bib'].get('author'),
+        'year': pub_complete['bib'].get('pub_year'),
+        'journal': pub_complete['bib'].get('journal'),
+        'citations': pub_complete.get('num_citations', 0),
+        'abstract': pub_complete['bib'].get('abstract'),
+        'url': pub_complete.get('pub_url')
+    }
+
 class GoogleScholarScraper:
     def __init__(self):
         """Initialize the scraper"""
@@ -23,11 +37,13 @@ class GoogleScholarScraper:
         """
         try:
             # Search for the author
-            search_query = scholarly.search_author(author_name)
-            author = next(search_query)
+            with stage_timer('scholarly_fetch'):
+                search_query = scholarly.search_author(author_name)
+                author = next(search_query)
             
             # Fill in all available author information
-            author = scholarly.fill(author)
+            with stage_timer('scholarly_fetch'):
+                author = scholarly.fill(author)
             return author
             
         except StopIteration:
@@ -47,23 +63,10 @@ class GoogleScholarScraper:
         Returns:
             List[Dict]: List of publication dictionaries
         """
-        publications = []
         try:
-            for pub in author['publications']:
-                pub_complete = scholarly.fill(pub)
-                publication_data = {
-                    'title': pub_complete['bib'].get('title'),
-                    'author': pub_complete['bib'].get('author'),
-                    'year': pub_complete['bib'].get('pub_year'),
-                    'journal': pub_complete['bib'].get('journal'),
-                    'citations': pub_complete.get('num_citations', 0),
-                    'abstract': pub_complete['bib'].get('abstract'),
-                    'url': pub_complete.get('pub_url')
-                }
-                publications.append(publication_data)
-                # Add delay to avoid getting blocked
-                time.sleep(2)
-            return publications
+            # Filled concurrently within the shared Scholar rate limit to avoid getting blocked
+            filled = fill_publications(author['publications'])
+            return [publication_data(pub) for pub in filled if pub is not None]
         except Exception as e:
             print(f"Error getting publications: {str(e)}")
             return []
@@ -93,6 +96,12 @@ class GoogleScholarScraper:
             print(f"Error saving results: {str(e)}")
 
 def main():
+    try:
+        run()
+    finally:
+        export_metrics()
+
+def run():
     # Example usage
     scraper = GoogleScholarScraper()
     
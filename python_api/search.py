@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+
+import os
+from typing import List, Optional, Sequence
+
+from pgvector.sqlalchemy import HALFVEC
+from sqlalchemy import ARRAY, Float, String, cast, func, literal, select, union_all
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array
+
+from db_models import Article, ArticleAuthor, TEXT_SEARCH_CONFIG
+from embedding_backends import EMBEDDING_MODEL
+from projection import PROJECTION_RERANK_FACTOR, Projection, not_projected_with
+from vector_index import VECTOR_DIMENSION, VECTOR_STORAGE, ann_candidates
+
+# With a compact index, fetch this many candidates per result and rerank them
+# by full-precision distance; 0 returns the index order as is
+SEARCH_RERANK_FACTOR = int(os.getenv('SEARCH_RERANK_FACTOR', '4'))
+# Hybrid search fuses this many candidates from each ranking (at least the limit)
+SEARCH_CANDIDATES = int(os.getenv('SEARCH_CANDIDATES', '50'))
+# Reciprocal rank fusion constant: score = sum(1 / (RRF_K + rank)) over rankings
+RRF_K = int(os.getenv('RRF_K', '60'))
+
+
+def authored_by(author_name: str):
+    """Articles linked to the author; a paper shared by co-authors matches for each of them"""
+    return Article.id.in_(
+        select(ArticleAuthor.article_id).where(ArticleAuthor.author_name == author_name)
+    )
+
+
+def article_author_names():
+    """Column of the authors linked to each selected article, in the order they were linked"""
+    names = select(
+        func.array_agg(aggregate_order_by(ArticleAuthor.author_name, ArticleAuthor.created_at))
+    ).where(ArticleAuthor.article_id == Article.id).correlate(Article).scalar_subquery()
+    return func.coalesce(names, cast(array([], type_=String), ARRAY(String))).label('author_names')
+
+
+def article_filters(
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    journal: Optional[str] = None,
+    author_name: Optional[str] = None
+) -> List:
+    """WHERE clauses shared by every search mode, applied inside the ranked queries"""
+    filters = []
+    if year_from is not None:
+        filters.append(Article.year >= year_from)
+    if year_to is not None:
+        filters.append(Article.year <= year_to)
+    if journal:
+        filters.append(Article.journal == journal)
+    if author_name:
+        filters.append(authored_by(author_name))
+    return filters
+
+
+def text_query(query_text: str):
+    """Parse free text the way web search boxes do (quotes, OR, -exclusions)"""
+    return func.websearch_to_tsquery(TEXT_SEARCH_CONFIG, query_text)
+
+
+def text_rank(query_text: str):
+    return func.ts_rank_cd(Article.search_vector, text_query(query_text))
+
+
+def same_model():
+    """Vectors from different embedding models aren't comparable; search only the current model's"""
+    return Article.embedding_model == EMBEDDING_MODEL
+
+
+def index_distance(column, query_embedding: Sequence[float]):
+    """Cosine distance written the way the ANN index is built, so ORDER BY ... LIMIT can use it"""
+    if VECTOR_STORAGE == 'halfvec':
+        return cast(column, HALFVEC(VECTOR_DIMENSION)).cosine_distance(query_embedding)
+    return column.cosine_distance(query_embedding)
+
+
+def exact_distance(column, query_embedding: Sequence[float]):
+    """
+    Cosine distance the ANN index can't serve, so ORDER BY ... LIMIT scans
+    the filtered rows exactly; for filters so selective that the index's
+    nearest rows would mostly be filtered out
+    """
+    # Adding zero keeps the planner from matching the expression to the index
+    return column.cosine_distance(query_embedding) + literal(0.0, Float)
+
+
+def projected_candidates(query_embedding: Sequence[float], n: int, projection: Projection, filters: Sequence = ()):
+    """
+    SELECT of the ids of up to 2n first-pass candidates: the n nearest in the
+    projected space, from its ANN index, and the n nearest by exact scan of
+    the rows not (yet) projected with this projection, normally few
+    """
+    projected = select(Article.id).where(
+        same_model(), Article.projection_version == projection.version, *filters
+    ).order_by(
+        Article.embedding_reduced.cosine_distance(projection.project_one(query_embedding))
+    ).limit(n)
+    unprojected = select(Article.id).where(
+        same_model(), not_projected_with(projection), *filters
+    ).order_by(
+        exact_distance(Article.embedding, query_embedding)
+    ).limit(n)
+    return union_all(*(part.subquery().select() for part in (projected, unprojected)))
+
+
+def nearest_articles(
+    query_embedding: Sequence[float],
+    limit: int,
+    columns: List = (Article.id,),
+    rerank_factor: int = SEARCH_RERANK_FACTOR,
+    filters: Sequence = (),
+    projection: Optional[Projection] = None,
+    exact: bool = False
+):
+    """
+    SELECT of the articles closest to the query embedding
+
+    Candidates come from the ANN index; when the index is compact they are
+    reranked by exact float32 distance before the final LIMIT. With a
+    projection, candidates come from the much smaller index on projected
+    vectors instead, and are always reranked. With exact, the filtered rows
+    are scanned without any index.
+    """
+    if exact:
+        return select(*columns).where(same_model(), *filters).order_by(
+            exact_distance(Article.embedding, query_embedding)
+        ).limit(limit)
+
+    if projection is not None:
+        first_pass = limit * PROJECTION_RERANK_FACTOR
+        candidates = projected_candidates(query_embedding, first_pass, projection, filters)
+        return ann_candidates(select(*columns).where(Article.id.in_(candidates)).order_by(
+            Article.embedding.cosine_distance(query_embedding)
+        ).limit(limit), first_pass)
+
+    if VECTOR_STORAGE == 'vector' or rerank_factor <= 0:
+        return ann_candidates(select(*columns).where(same_model(), *filters).order_by(
+            index_distance(Article.embedding, query_embedding)
+        ).limit(limit), limit)
+
+    candidates = select(Article.id).where(same_model(), *filters).order_by(
+        index_distance(Article.embedding, query_embedding)
+    ).limit(limit * rerank_factor)
+
+    return ann_candidates(select(*columns).where(Article.id.in_(candidates)).order_by(
+        Article.embedding.cosine_distance(query_embedding)
+    ).limit(limit), limit * rerank_factor)
+
+
+def matching_articles(
+    query_text: str,
+    limit: int,
+    columns: List = (Article.id,),
+    filters: Sequence = ()
+):
+    """SELECT of the articles whose title/abstract match the query, best text rank first"""
+    return select(*columns).where(
+        Article.search_vector.op('@@')(text_query(query_text)),
+        *filters
+    ).order_by(text_rank(query_text).desc(), Article.id).limit(limit)
+
+
+def hybrid_articles(
+    query_text: str,
+    query_embedding: Sequence[float],
+    limit: int,
+    columns: List = (Article.id,),
+    filters: Sequence = (),
+    candidates: int = SEARCH_CANDIDATES,
+    rrf_k: int = RRF_K,
+    projection: Optional[Projection] = None,
+    exact: bool = False
+):
+    """
+    SELECT fusing vector and full-text rankings with reciprocal rank fusion
+
+    Both rankings are index-driven top-N subqueries with the filters pushed
+    into them; everything runs as one statement. With a projection, the
+    vector ranking is an exact rerank of first-pass projected candidates;
+    with exact, it is an exact scan of the filtered rows.
+    """
+    candidates = max(candidates, limit)
+    ann_limit = candidates
+
+    if exact:
+        distance = exact_distance(Article.embedding, query_embedding)
+        vector_ranked = select(
+            Article.id,
+            func.row_number().over(order_by=distance).label('rank')
+        ).where(same_model(), *filters).order_by(distance).limit(candidates)
+    elif projection is not None:
+        ann_limit = candidates * PROJECTION_RERANK_FACTOR
+        distance = Article.embedding.cosine_distance(query_embedding)
+        vector_ranked = select(
+            Article.id,
+            func.row_number().over(order_by=distance).label('rank')
+        ).where(Article.id.in_(
+            projected_candidates(query_embedding, ann_limit, projection, filters)
+        )).order_by(distance).limit(candidates)
+    else:
+        distance = index_distance(Article.embedding, query_embedding)
+        vector_ranked = select(
+            Article.id,
+            func.row_number().over(order_by=distance).label('rank')
+        ).where(same_model(), *filters).order_by(distance).limit(candidates)
+
+    relevance = text_rank(query_text).desc()
+    text_ranked = select(
+        Article.id,
+        func.row_number().over(order_by=(relevance, Article.id)).label('rank')
+    ).where(
+        Article.search_vector.op('@@')(text_query(query_text)),
+        *filters
+    ).order_by(relevance, Article.id).limit(candidates)
+
+    hits = union_all(vector_ranked, text_ranked).subquery()
+    fused = select(
+        hits.c.id,
+        func.sum(literal(1.0, Float) / (rrf_k + hits.c.rank)).label('score')
+    ).group_by(hits.c.id).subquery()
+
+    return ann_candidates(select(*columns).join(fused, fused.c.id == Article.id).order_by(
+        fused.c.score.desc(), Article.id
+    ).limit(limit), ann_limit)
+
+
+def search_articles(
+    mode: str,
+    query_text: str,
+    query_embedding: Optional[Sequence[float]],
+    limit: int,
+    columns: List = (Article.id,),
+    filters: Sequence = (),
+    projection: Optional[Projection] = None,
+    exact: bool = False
+):
+    """
+    SELECT for one search in the given mode: `vector`, `text` (needs no
+    embedding) or `hybrid`; exact scans the filtered rows instead of the index
+    """
+    if mode == 'text':
+        return matching_articles(query_text, limit, columns, filters)
+    if mode == 'hybrid':
+        return hybrid_articles(
+            query_text, query_embedding, limit, columns, filters, projection=projection, exact=exact
+        )
+    # Cosine distance ORDER BY ... LIMIT is served by the ANN index
+    return nearest_articles(query_embedding, limit, columns, filters=filters, projection=projection, exact=exact)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+from data_version import get_data_version
+from embed_articles import SessionLocal
+from matching import MatchingEngine, MATCHING_PRECISION
+from quantization import CompactMatrix, PRECISIONS
+
+# Snapshot file API workers map instead of each loading the vectors from the
+# database; unset to have every process build its own engine
+MATCHING_SNAPSHOT = os.getenv('MATCHING_SNAPSHOT')
+# How often `snapshot.py --watch` checks the corpus version (seconds)
+SNAPSHOT_POLL_SECONDS = float(os.getenv('SNAPSHOT_POLL_SECONDS', '10'))
+
+# File layout: magic, format version, header length, JSON header (versions,
+# ids, names and array offsets), then the arrays, each 64-byte aligned
+_MAGIC = b'SCHOLSNP'
+_FORMAT_VERSION = 1
+_PREFIX = struct.Struct('<8sII')
+_ALIGN = 64
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def write_snapshot(engine: MatchingEngine, path: str, version: int):
+    """
+    Write the engine's matrices and id index to path
+
+    The file is written next to the target and renamed over it, so readers
+    see either the old or the new snapshot, never a partial one. Workers that
+    still map the old file keep a valid mapping until they switch.
+    """
+    arrays = {
+        'profile': engine.profile_matrix.data,
+        'work': engine.work_matrix.data,
+        'has_profile': np.asarray(engine.has_profile, dtype=np.bool_),
+        'has_work': np.asarray(engine.has_work, dtype=np.bool_),
+    }
+    if engine.profile_matrix.scales is not None:
+        arrays['profile_scales'] = engine.profile_matrix.scales
+        arrays['work_scales'] = engine.work_matrix.scales
+
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = _aligned(offset)
+        layout[name] = {'offset': offset, 'dtype': str(array.dtype), 'shape': list(array.shape)}
+        offset += array.nbytes
+
+    header = json.dumps({
+        'version': version,
+        'precision': engine.profile_matrix.precision,
+        'author_ids': engine.author_ids,
+        'names': engine.names,
+        'arrays': layout,
+    }).encode('utf-8')
+    data_start = _aligned(_PREFIX.size + len(header))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(_PREFIX.pack(_MAGIC, _FORMAT_VERSION, len(header)))
+            f.write(header)
+            for name, array in arrays.items():
+                f.seek(data_start + layout[name]['offset'])
+                f.write(np.ascontiguousarray(array).tobytes())
+            # Empty arrays still need their offsets inside the file
+            f.truncate(data_start + _aligned(offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_snapshot(path: str) -> MatchingEngine:
+    """Map a snapshot read-only; the matrices stay in the shared page cache"""
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, format_version, header_length = _PREFIX.unpack_from(buffer, 0)
+    if magic != _MAGIC or format_version != _FORMAT_VERSION:
+        raise ValueError(f"Not a format {_FORMAT_VERSION} matching snapshot: {path}")
+    header = json.loads(buffer[_PREFIX.size:_PREFIX.size + header_length])
+    data_start = _aligned(_PREFIX.size + header_length)
+
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape']))
+        arrays[name] = np.frombuffer(
+            buffer, dtype=dtype, count=count, offset=data_start + spec['offset']
+        ).reshape(spec['shape'])
+
+    engine = MatchingEngine.from_compact(
+        header['author_ids'],
+        header['names'],
+        CompactMatrix.wrap(arrays['profile'], arrays.get('profile_scales')),
+        CompactMatrix.wrap(arrays['work'], arrays.get('work_scales')),
+        arrays['has_profile'],
+        arrays['has_work']
+    )
+    engine.version = header['version']
+    return engine
+
+
+def publish_snapshot(db, path: str = MATCHING_SNAPSHOT, precision: str = MATCHING_PRECISION) -> int:
+    """Build an engine from the database and publish it as the current snapshot"""
+    # Read the version first: if ingest commits meanwhile, the snapshot is
+    # labelled older than its data and simply gets rebuilt on the next check
+    version = get_data_version(db)
+    engine = MatchingEngine.from_database(db, precision=precision)
+    write_snapshot(engine, path, version)
+    return version
+
+
+class SnapshotReader:
+    """
+    Per-process handle on the published snapshot
+
+    A stat() per call notices when a new file was renamed into place; the new
+    file is then mapped and the old mapping dropped with the old engine.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._engine: Optional[MatchingEngine] = None
+        self._identity = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[MatchingEngine]:
+        """Current engine, or None while nothing has been published"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+
+        identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if identity != self._identity:
+                try:
+                    self._engine = load_snapshot(self.path)
+                    self._identity = identity
+                except Exception as e:
+                    print(f"Error loading matching snapshot: {str(e)}")
+            return self._engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish the matching snapshot shared by API workers")
+    parser.add_argument('-o', '--output', default=MATCHING_SNAPSHOT or 'snapshots/matching.snap')
+    parser.add_argument('--precision', choices=PRECISIONS, default=MATCHING_PRECISION)
+    parser.add_argument('--watch', action='store_true', help="Republish whenever the corpus version changes")
+    args = parser.parse_args()
+
+    published = None
+    while True:
+        db = SessionLocal()
+        try:
+            version = get_data_version(db)
+            if version != published:
+                started = time.monotonic()
+                published = publish_snapshot(db, args.output, args.precision)
+                print(f"Published snapshot version {published} to {args.output} "
+                      f"in {time.monotonic() - started:.2f}s")
+        finally:
+            db.close()
+
+        if not args.watch:
+            return
+        time.sleep(SNAPSHOT_POLL_SECONDS)
+
+
+if __name__ == "__main__":
+    main()
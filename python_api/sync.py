@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import exists, select
+from sqlalchemy.dialects.postgresql import insert
+
+from db_models import Author, AuthorSyncState, IngestJob
+from fingerprints import title_key
+
+# An author whose sync found something is checked again after the minimum
+# interval; each sync that finds nothing doubles it, up to the maximum
+SYNC_MIN_INTERVAL_HOURS = float(os.getenv('SYNC_MIN_INTERVAL_HOURS', '24'))
+SYNC_MAX_INTERVAL_DAYS = float(os.getenv('SYNC_MAX_INTERVAL_DAYS', '30'))
+# Walk the publication list at least this often, even if the citation total didn't move
+SYNC_LIST_INTERVAL_DAYS = float(os.getenv('SYNC_LIST_INTERVAL_DAYS', '7'))
+
+_MIN_INTERVAL = SYNC_MIN_INTERVAL_HOURS * 3600
+_MAX_INTERVAL = SYNC_MAX_INTERVAL_DAYS * 86400
+
+
+def publication_id(pub: Dict) -> Optional[str]:
+    """Stable id of an entry in a profile's publication list ("<scholar id>:<pub id>")"""
+    return pub.get('author_pub_id')
+
+
+def publication_key(pub: Dict) -> Optional[str]:
+    """Title key of a listed publication (see fingerprints.title_key), None if it has no title"""
+    title = pub['bib'].get('title')
+    if title is None:
+        return None
+    return title_key(title, pub['bib'].get('pub_year'))
+
+
+def get_sync_state(db, scholar_id: str) -> Optional[AuthorSyncState]:
+    return db.get(AuthorSyncState, scholar_id)
+
+
+def needs_listing(state: Optional[AuthorSyncState], citedby: Optional[int]) -> bool:
+    """
+    Whether the publication list has to be fetched again
+
+    A profile whose citation total is unchanged since a recent listing, and
+    whose listed publications were all stored, almost certainly has nothing
+    new; checking that costs one request instead of one per page of
+    publications.
+    """
+    if state is None or state.listed_at is None or state.citedby is None:
+        return True
+    if citedby is None or citedby != state.citedby:
+        return True
+    if len(state.publications) < state.publication_count:
+        return True
+    return datetime.now(timezone.utc) - state.listed_at > timedelta(days=SYNC_LIST_INTERVAL_DAYS)
+
+
+def diff_publications(
+    state: Optional[AuthorSyncState],
+    publications: List[Dict],
+    stored_keys: Set[str]
+) -> Tuple[List[Dict], Dict[str, int]]:
+    """
+    Compare a fresh publication list with what the last sync stored
+
+    Returns:
+        Tuple[List[Dict], Dict[str, int]]: Publications that are new and not
+        linked to the author yet, and {title key: num_citations} of known
+        publications whose citation count changed (updated without filling)
+    """
+    known = state.publications if state else {}
+    new_pubs = []
+    citations = {}
+    for pub in publications:
+        pub_id = publication_id(pub)
+        key = publication_key(pub)
+        if key is None:
+            continue
+        if pub_id in known:
+            if known[pub_id] != pub.get('num_citations', 0):
+                citations[key] = pub.get('num_citations', 0)
+        elif key not in stored_keys:
+            new_pubs.append(pub)
+    return new_pubs, citations
+
+
+def stored_publications(publications: Iterable[Dict], stored_keys: Set[str]) -> Dict[str, int]:
+    """{author_pub_id: num_citations} of the listed publications linked to the author in the database"""
+    return {
+        publication_id(pub): pub.get('num_citations', 0)
+        for pub in publications
+        if publication_id(pub) and publication_key(pub) in stored_keys
+    }
+
+
+def record_sync(
+    db,
+    scholar_id: str,
+    author_name: str,
+    citedby: Optional[int],
+    changed: bool,
+    publications: Optional[Dict[str, int]] = None,
+    publication_count: Optional[int] = None
+):
+    """
+    Store the outcome of a sync and schedule the next one (commits)
+
+    publications and publication_count are only given when the list was
+    walked; otherwise the previous listing is kept.
+    """
+    state = get_sync_state(db, scholar_id)
+    now = datetime.now(timezone.utc)
+    if state is None:
+        state = AuthorSyncState(scholar_id=scholar_id, publications={}, sync_interval_seconds=_MIN_INTERVAL)
+        db.add(state)
+
+    if changed or state.last_synced_at is None:
+        interval = _MIN_INTERVAL
+        state.last_changed_at = now
+    else:
+        interval = min(_MAX_INTERVAL, max(_MIN_INTERVAL, state.sync_interval_seconds * 2))
+
+    state.author_name = author_name
+    state.citedby = citedby
+    if publications is not None:
+        state.publications = publications
+        state.publication_count = publication_count if publication_count is not None else len(publications)
+        state.listed_at = now
+    state.last_synced_at = now
+    state.sync_interval_seconds = interval
+    state.next_sync_at = now + timedelta(seconds=interval)
+    db.commit()
+
+
+def due_scholars(db, limit: int) -> List[str]:
+    """
+    Authors to sync next, in priority order
+
+    Authors that were never synced come first, then overdue ones, most
+    overdue first. Authors with a queued or running job are skipped.
+    """
+    active_job = exists().where(
+        IngestJob.scholar_id == Author.id,
+        IngestJob.status.in_(('queued', 'running'))
+    )
+    scholar_ids = list(db.scalars(
+        select(Author.id).outerjoin(
+            AuthorSyncState, AuthorSyncState.scholar_id == Author.id
+        ).where(
+            AuthorSyncState.scholar_id.is_(None),
+            ~active_job
+        ).order_by(Author.created_at, Author.id).limit(limit)
+    ))
+    if len(scholar_ids) < limit:
+        active_job = exists().where(
+            IngestJob.scholar_id == AuthorSyncState.scholar_id,
+            IngestJob.status.in_(('queued', 'running'))
+        )
+        scholar_ids.extend(db.scalars(
+            select(AuthorSyncState.scholar_id).where(
+                AuthorSyncState.next_sync_at <= datetime.now(timezone.utc),
+                ~active_job
+            ).order_by(AuthorSyncState.next_sync_at).limit(limit - len(scholar_ids))
+        ))
+    return scholar_ids
+
+
+def defer_sync(db, scholar_id: str):
+    """
+    Push an author's next sync back by its interval when a job is queued for it
+
+    A sync that keeps failing is then retried once per interval instead of
+    on every scheduler pass. Runs inside the caller's transaction.
+    """
+    now = datetime.now(timezone.utc)
+    statement = insert(AuthorSyncState).values(
+        scholar_id=scholar_id,
+        publications={},
+        sync_interval_seconds=_MIN_INTERVAL,
+        next_sync_at=now + timedelta(seconds=_MIN_INTERVAL)
+    )
+    db.execute(statement.on_conflict_do_update(
+        index_elements=['scholar_id'],
+        set_={'next_sync_at': now + timedelta(seconds=1) * AuthorSyncState.sync_interval_seconds}
+    ))
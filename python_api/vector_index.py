@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+import os
+from typing import Dict
+
+from sqlalchemy import event, text
+
+# Approximate nearest neighbour index configuration
+VECTOR_INDEX_TYPE = os.getenv('VECTOR_INDEX_TYPE', 'hnsw')  # 'hnsw' or 'ivfflat'
+HNSW_M = int(os.getenv('HNSW_M', '16'))
+HNSW_EF_CONSTRUCTION = int(os.getenv('HNSW_EF_CONSTRUCTION', '64'))
+HNSW_EF_SEARCH = int(os.getenv('HNSW_EF_SEARCH', '40'))
+# Keep scanning an HNSW index until enough rows pass the query's filters
+# ('strict_order', 'relaxed_order' or 'off'; needs pgvector >= 0.8)
+HNSW_ITERATIVE_SCAN = os.getenv('HNSW_ITERATIVE_SCAN', 'strict_order')
+# pgvector's upper bound for hnsw.ef_search
+HNSW_MAX_EF_SEARCH = 1000
+IVFFLAT_LISTS = int(os.getenv('IVFFLAT_LISTS', '1000'))
+IVFFLAT_PROBES = int(os.getenv('IVFFLAT_PROBES', '10'))
+# Precision the indexes are built on: 'vector' (float32) or 'halfvec' (float16,
+# half the index size; needs pgvector >= 0.7). Rows keep full precision either way.
+VECTOR_STORAGE = os.getenv('VECTOR_STORAGE', 'vector')
+VECTOR_DIMENSION = 1536
+# Dimension of the projected vectors used for first-pass search (see projection.py)
+PROJECTION_DIMENSION = int(os.getenv('PROJECTION_DIMENSION', '128'))
+
+# (table, column) pairs that get a cosine-distance ANN index
+VECTOR_COLUMNS = [
+    ('articles', 'embedding'),
+    ('authors', 'embedding'),
+    ('author_centroids', 'embedding'),
+]
+# Projected vectors are already small; they are always indexed at full precision
+REDUCED_VECTOR_COLUMNS = [
+    ('articles', 'embedding_reduced'),
+]
+
+
+def index_name(table: str, column: str) -> str:
+    return f"{table}_{column}_ann_idx"
+
+
+def index_definition(table: str, column: str, storage: str = VECTOR_STORAGE) -> str:
+    """CREATE INDEX statement for the configured index type"""
+    if VECTOR_INDEX_TYPE == 'hnsw':
+        method = 'hnsw'
+        options = f"m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION}"
+    elif VECTOR_INDEX_TYPE == 'ivfflat':
+        method = 'ivfflat'
+        options = f"lists = {IVFFLAT_LISTS}"
+    else:
+        raise ValueError(f"Unknown VECTOR_INDEX_TYPE: {VECTOR_INDEX_TYPE}")
+
+    if storage == 'vector':
+        target = f"{column} vector_cosine_ops"
+    elif storage == 'halfvec':
+        target = f"({column}::halfvec({VECTOR_DIMENSION})) halfvec_cosine_ops"
+    else:
+        raise ValueError(f"Unknown VECTOR_STORAGE: {storage}")
+
+    return (
+        f"CREATE INDEX {index_name(table, column)} ON {table} "
+        f"USING {method} ({target}) WITH ({options})"
+    )
+
+
+def _existing_indexes(conn) -> Dict[str, str]:
+    rows = conn.execute(text(
+        "SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = current_schema()"
+    ))
+    return {name: definition for name, definition in rows}
+
+
+def _matches(existing: str, wanted: str) -> bool:
+    """Compare index definitions ignoring case, whitespace, quoting and parentheses"""
+    def squash(s):
+        for noise in ("'", 'public.', '(', ')'):
+            s = s.replace(noise, '')
+        return ''.join(s.lower().split())
+    return squash(existing) == squash(wanted)
+
+
+def ensure_vector_indexes(engine):
+    """
+    Create (or rebuild, if the configuration changed) the ANN indexes
+
+    IVFFlat picks its cluster centers at build time, so rebuild it after
+    loading data; HNSW can be created on an empty table.
+    """
+    with engine.connect() as conn:
+        existing = _existing_indexes(conn)
+        columns = [(table, column, VECTOR_STORAGE) for table, column in VECTOR_COLUMNS]
+        columns += [(table, column, 'vector') for table, column in REDUCED_VECTOR_COLUMNS]
+        for table, column, storage in columns:
+            name = index_name(table, column)
+            wanted = index_definition(table, column, storage)
+
+            if name in existing:
+                if _matches(existing[name], wanted):
+                    continue
+                print(f"Rebuilding {name} with new parameters")
+                conn.execute(text(f"DROP INDEX {name}"))
+
+            conn.execute(text(wanted))
+        conn.commit()
+
+
+def ann_candidates(statement, n: int):
+    """
+    Mark a statement as needing n rows from an HNSW scan
+
+    An HNSW scan returns at most hnsw.ef_search rows, so LIMIT n silently
+    returns fewer when n is larger; configure_search_session raises it for
+    the statement's transaction.
+    """
+    current = statement.get_execution_options().get('ann_candidates', 0)
+    return statement.execution_options(ann_candidates=max(n, current))
+
+
+def configure_search_session(engine):
+    """Apply ef_search/probes to every new connection of the engine, and widen ef_search per statement"""
+    @event.listens_for(engine, "connect")
+    def set_search_params(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            if VECTOR_INDEX_TYPE == 'hnsw':
+                cursor.execute(f"SET hnsw.ef_search = {HNSW_EF_SEARCH}")
+            else:
+                cursor.execute(f"SET ivfflat.probes = {IVFFLAT_PROBES}")
+            dbapi_connection.commit()
+        except Exception as e:
+            dbapi_connection.rollback()
+            print(f"Error configuring vector search: {str(e)}")
+        finally:
+            cursor.close()
+
+        if VECTOR_INDEX_TYPE != 'hnsw' or HNSW_ITERATIVE_SCAN == 'off':
+            return
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"SET hnsw.iterative_scan = {HNSW_ITERATIVE_SCAN}")
+            dbapi_connection.commit()
+        except Exception as e:
+            # Older pgvector: filtered searches may return fewer rows than asked for
+            dbapi_connection.rollback()
+            print(f"Error enabling iterative index scans (pgvector >= 0.8 needed): {str(e)}")
+        finally:
+            cursor.close()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def widen_search(conn, cursor, statement, parameters, context, executemany):
+        n = context.execution_options.get('ann_candidates') if context is not None else None
+        if VECTOR_INDEX_TYPE == 'hnsw' and n and n > HNSW_EF_SEARCH:
+            # Lasts until the end of the transaction, which only ever widens later scans in it
+            cursor.execute(f"SET LOCAL hnsw.ef_search = {min(int(n), HNSW_MAX_EF_SEARCH)}")